@@ -0,0 +1,346 @@
+# bench_hot_path.py
+# Benchmarks for the producer hot path, one stage at a time on synthetic workloads:
+#   extract  : utils.extract_payload + is_divergence_event over console lines (with noise)
+#   parse    : console_parser.parse over the same lines (fast path)
+#   order    : sequence_order.order_by_l1_time
+#   enrich   : bybit_highs_lows_15m_batch.process against FakeExchange (cold cache)
+#   codec    : wire_codec encode/decode of an enriched block per negotiable format (+ bytes/event)
+#   broadcast: ws_emit_bridge.send → N in-process websocket clients
+# Sweeps block size / candle span / client count and reports throughput, p50/p99 and allocations.
+# Results are compared with data/bench_baseline.json; --save writes a new baseline.
+#
+#   python -m Scripts.Trading_Bot_Test3.CatchJS_Data_WS.Benchmarks.bench_hot_path --quick
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import suppress
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import utils, console_parser
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import sequence_order
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_highs_lows_15m_batch as highs_lows
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData.candle_store import CandleStore
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.Replay.fake_exchange import FakeExchange
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.Replay.replay_runner import percentile
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import events_from_dicts
+
+# this file is at .../Scripts/Trading_Bot_Test3/CatchJS_Data_WS/Benchmarks/bench_hot_path.py
+BASELINE_PATH = Path(__file__).resolve().parents[2] / "data" / "bench_baseline.json"
+PREFIX = "[AGGR INDICATOR]"
+REGRESSION_PCT = 20.0   # p50 slower than baseline by more than this → flagged
+
+BLOCK_SIZES = (10, 100, 500)
+CANDLE_SPANS = (500, 5_000, 20_000)   # 15m bars between the oldest and newest pivot
+CLIENT_COUNTS = (1, 10, 50)
+
+_T0 = 1_757_000_000  # s, fixed origin keeps runs comparable
+_STEP_S = 900
+_broadcast_seq = count(1)   # hub-wide: a new client's snapshot must never look like a current sequence
+
+
+# -------------------- synthetic workload --------------------
+def make_block(n: int, *, span_bars: int = 2_000, sequence: int = 1, tf_sec: int = 900) -> List[dict]:
+    """n divergence payloads (console dicts) whose pivots spread over `span_bars` 15m bars (deterministic)."""
+    out: List[dict] = []
+    for i in range(n):
+        l1 = _T0 + ((i * 7919) % max(1, span_bars - 40)) * _STEP_S
+        l2 = l1 + (10 + i % 30) * _STEP_S
+        p1, p2 = 100_000 + i * 1.25, 100_400 + i * 1.5
+        out.append({
+            "v": 1, "source": "aggr/indicator", "tf_sec": tf_sec, "side": "bull" if i % 2 else "bear",
+            "status": "✅" if i % 3 else "❔",
+            "thread_id": f"bull:{p1:.2f}-{p2:.2f}:{tf_sec}:{i}", "pair_id": f"L1:{p1:.2f}|L2:{p2:.2f}|{i}",
+            "sequence": sequence,
+            "L1": {"time": l1, "price": p1}, "L2": {"time": l2, "price": p2},
+            "cvd": {"L1": -9.1e8 - i, "L2": -9.3e8 - i},
+            "meta": {"start": l2, "end": l1, "sIndex": i, "eIndex": i + 10},
+        })
+    return out
+
+
+def make_console_lines(n: int, *, noise_ratio: float = 0.8) -> List[str]:
+    """Console traffic: mostly unrelated chart logs, the rest prefixed divergence payloads."""
+    events = make_block(max(1, int(n * (1 - noise_ratio))))
+    lines: List[str] = []
+    k = 0
+    for i in range(n):
+        if (i % 10) < int(noise_ratio * 10):
+            lines.append(f"[aggr] trades flushed: {i} @ {100_000 + i * 0.5:.1f} ({i % 17} exchanges)")
+        else:
+            lines.append(f"{PREFIX} {json.dumps(events[k % len(events)])}")
+            k += 1
+    return lines
+
+
+# -------------------- measurement --------------------
+def measure(fn: Callable[[], object], *, repeat: int, units: int = 1) -> Dict[str, float]:
+    """Time `fn` `repeat` times (plus one traced run for allocations)."""
+    fn()  # warm-up
+    times: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    fn()
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_s = sum(times) / 1000
+    return {
+        "p50_ms": round(percentile(times, 50), 4),
+        "p99_ms": round(percentile(times, 99), 4),
+        "ops_per_s": round(units * repeat / total_s, 1) if total_s else 0.0,
+        "alloc_peak_kb": round((peak - before) / 1024, 1),
+    }
+
+
+def bench_extract(n_lines: int, repeat: int) -> Dict[str, float]:
+    lines = make_console_lines(n_lines)
+
+    def run():
+        for text in lines:
+            ok, payload = utils.extract_payload(text, PREFIX)
+            if ok and isinstance(payload, dict):
+                utils.is_divergence_event(payload)
+
+    return measure(run, repeat=repeat, units=n_lines)
+
+
+def bench_parse(n_lines: int, repeat: int) -> Dict[str, float]:
+    lines = make_console_lines(n_lines)
+    parse = console_parser.parse
+
+    def run():
+        for text in lines:
+            parse(text, PREFIX)
+
+    return measure(run, repeat=repeat, units=n_lines)
+
+
+def bench_order(block_size: int, repeat: int) -> Dict[str, float]:
+    block = events_from_dicts(make_block(block_size))
+    block.reverse()
+    return measure(lambda: sequence_order.order_by_l1_time(block), repeat=repeat, units=block_size)
+
+
+def _enriched_block(block_size: int) -> list:
+    return [ev.enriched(ev.l1_price - 50.0, ev.l2_price - 50.0, ev.l2_price + 900.0, ev.l2_time + 4 * _STEP_S)
+            for ev in events_from_dicts(make_block(block_size))]
+
+
+def bench_codec(name: str, block_size: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Encode + decode of one enriched block with a wire_codec format; bytes_per_event on both rows."""
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec
+    codec = wire_codec.get(name)
+    block = _enriched_block(block_size)
+    wire = codec.encode(block)
+    size = round(len(wire.encode("utf-8") if isinstance(wire, str) else wire) / block_size, 1)
+    enc = measure(lambda: codec.encode(block), repeat=repeat, units=block_size)
+    dec = measure(lambda: codec.decode(wire), repeat=repeat, units=block_size)
+    enc["bytes_per_event"] = dec["bytes_per_event"] = size
+    return {"encode": enc, "decode": dec}
+
+
+def bench_delta(name: str, block_size: int, changed: int, repeat: int) -> Dict[str, float]:
+    """Hub-side BlockDiff + encode of a block where `changed` threads differ from the previous one."""
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.block_delta import BlockDiff
+    codec = wire_codec.get(name)
+    pair = []
+    for seq in (1, 2):
+        block = _enriched_block(block_size)
+        for i, ev in enumerate(block):
+            ev.sequence = seq
+            if i < changed and seq == 2:
+                ev.status = "❌"
+        pair.append(block)
+    diff = BlockDiff()
+    msg_ids = count(1)
+    diff.update(pair[1], next(msg_ids), 2)  # every run then diffs against the other block
+
+    def run():
+        msg_id = next(msg_ids)
+        block = pair[msg_id % 2]
+        seq = block[0].sequence
+        d = diff.update(block, msg_id, seq)
+        if d.parts is None:
+            return codec.encode_frame(msg_id, block)
+        return codec.encode(wire_codec.delta(msg_id, seq, d.parts, d.order))
+
+    wire = run()
+    r = measure(run, repeat=repeat, units=block_size)
+    r["bytes_per_event"] = round(len(wire.encode("utf-8") if isinstance(wire, str) else wire) / block_size, 1)
+    return r
+
+
+def bench_enrich(block_size: int, span_bars: int, repeat: int) -> Dict[str, float]:
+    """Cold enrichment (empty PivotCache/window each run; candles from a warm scratch store)."""
+    block = events_from_dicts(make_block(block_size, span_bars=span_bars))
+    highs_lows.use_exchange(FakeExchange())
+    with tempfile.TemporaryDirectory() as scratch:
+        store = CandleStore(Path(scratch))
+
+        def run():
+            highs_lows.reset_windows()
+            highs_lows.process(block, cache=highs_lows.PivotCache(), store=store)
+
+        try:
+            return measure(run, repeat=repeat, units=block_size)
+        finally:
+            highs_lows.use_exchange(None)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_hub() -> int:
+    """Start ws_emit_bridge once on a free port (the hub is a process-wide singleton)."""
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
+    port = _free_port()
+    ws_emit_bridge.start_server("127.0.0.1", port)
+    return port
+
+
+def bench_broadcast(port: int, block_size: int, n_clients: int, repeat: int) -> Dict[str, float]:
+    """Latency from ws_emit_bridge.send(block) until every client has the whole block."""
+    import websockets
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
+
+    loop = asyncio.new_event_loop()
+    conns: List = []
+    done_evt: Dict[int, threading.Event] = {}
+    seen: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    async def _reader(ws):
+        with suppress(Exception):
+            async for msg in ws:
+                data = json.loads(msg)
+                for ev in (data if isinstance(data, list) else [data]):
+                    if ev.get("meta", {}).get("sIndex") != block_size - 1:
+                        continue
+                    seq = ev.get("sequence")
+                    with lock:
+                        seen[seq] = seen.get(seq, 0) + 1
+                        if seen[seq] == n_clients and seq in done_evt:
+                            done_evt[seq].set()
+
+    async def _connect_all():
+        for _ in range(n_clients):
+            for _attempt in range(100):
+                try:
+                    ws = await websockets.connect(f"ws://127.0.0.1:{port}", max_size=None)
+                    break
+                except OSError:
+                    await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError(f"hub on :{port} not reachable")
+            conns.append(ws)
+            loop.create_task(_reader(ws))
+
+    async def _close_all():
+        for ws in conns:
+            with suppress(Exception):
+                await ws.close()
+
+    t = threading.Thread(target=loop.run_forever, name="bench-clients", daemon=True)
+    t.start()
+    asyncio.run_coroutine_threadsafe(_connect_all(), loop).result(timeout=30)
+    time.sleep(0.2)  # let the hub register every client
+
+    seq_no = [0]
+
+    def run():
+        seq_no[0] = next(_broadcast_seq)
+        evt = threading.Event()
+        with lock:
+            done_evt[seq_no[0]] = evt
+        ws_emit_bridge.send(events_from_dicts(make_block(block_size, sequence=seq_no[0])))
+        if not evt.wait(timeout=10):
+            raise RuntimeError(f"broadcast of sequence {seq_no[0]} did not reach {n_clients} clients")
+
+    try:
+        return measure(run, repeat=repeat, units=block_size * n_clients)
+    finally:
+        asyncio.run_coroutine_threadsafe(_close_all(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        t.join(timeout=3)
+
+
+# -------------------- suite --------------------
+def run_suite(*, quick: bool = False, with_ws: bool = True) -> Dict[str, Dict[str, float]]:
+    repeat = 5 if quick else 30
+    blocks = BLOCK_SIZES[:2] if quick else BLOCK_SIZES
+    spans = CANDLE_SPANS[:2] if quick else CANDLE_SPANS
+    clients = CLIENT_COUNTS[:2] if quick else CLIENT_COUNTS
+
+    results: Dict[str, Dict[str, float]] = {}
+    results["extract/lines=10000"] = bench_extract(10_000, repeat)
+    results[f"parse/lines=10000/{console_parser.backend()}"] = bench_parse(10_000, repeat)
+    for n in blocks:
+        results[f"order/block={n}"] = bench_order(n, repeat * 10)
+    for n in blocks:
+        for span in spans:
+            results[f"enrich/block={n}/bars={span}"] = bench_enrich(n, span, repeat)
+    from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec
+    for name in wire_codec.available():
+        for op, r in bench_codec(name, 100, repeat * 10).items():
+            results[f"codec/{name}/{op}/block=100"] = r
+    best = wire_codec.available()[0]
+    for k in (0, 10, 100):
+        results[f"delta/{best}/block=100/changed={k}"] = bench_delta(best, 100, k, repeat * 10)
+    if with_ws:
+        from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
+        port = start_hub()
+        try:
+            for n in blocks:
+                for c in clients:
+                    results[f"broadcast/block={n}/clients={c}"] = bench_broadcast(port, n, c, repeat)
+        finally:
+            ws_emit_bridge.stop()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]]) -> None:
+    print(f"{'case':<36}{'p50 ms':>11}{'p99 ms':>11}{'ops/s':>13}{'alloc kB':>10}{'vs base':>10}{'B/event':>9}")
+    for case, r in results.items():
+        delta = ""
+        base = (baseline or {}).get(case)
+        if base and base.get("p50_ms"):
+            pct = (r["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100
+            delta = f"{pct:+.0f}%" + (" ⚠️" if pct > REGRESSION_PCT else "")
+        size = f"{r['bytes_per_event']:.1f}" if "bytes_per_event" in r else ""
+        print(f"{case:<36}{r['p50_ms']:>11.4f}{r['p99_ms']:>11.4f}{r['ops_per_s']:>13.1f}{r['alloc_peak_kb']:>10.1f}{delta:>10}{size:>9}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Producer hot-path benchmarks.")
+    ap.add_argument("--quick", action="store_true", help="smaller sweep, fewer repeats")
+    ap.add_argument("--no-ws", action="store_true", help="skip the websocket broadcast stage")
+    ap.add_argument("--save", action="store_true", help=f"write results as the new baseline ({BASELINE_PATH.name})")
+    args = ap.parse_args()
+
+    res = run_suite(quick=args.quick, with_ws=not args.no_ws)
+    base = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else None
+    compare(res, base)
+    if args.save:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"Baseline saved → {BASELINE_PATH}")
@@ -0,0 +1,67 @@
+# CatchData/block_assembler.py
+# Console events → blocks, shared by the sync (playwright_session) and async (playwright_session_async)
+# capture loops. No Playwright import: the assembler only sees parsed DivergenceEvents.
+from collections import deque
+from time import monotonic
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+
+class BlockAssembler:
+    """
+    Console-driven block assembly (latest sequence wins).
+    - add(ev)          : buffer an event; a newer sequence replaces the unfinished one (tail-drop)
+    - end(seq)         : end-of-sequence marker → block is ready immediately
+    - flush_due(now)   : block is ready once its last event is older than the debounce
+    Ready blocks land in `ready` (maxlen=1, so an unconsumed older block is dropped too).
+    A lower sequence arriving more than the debounce after the last block finished means the
+    indicator's counter restarted (page reload / indicator restart): it starts a new block.
+    Callbacks fire inside Playwright waits on the same thread, so no locking is needed.
+    """
+
+    def __init__(self, debounce_s: float):
+        self.debounce_s = debounce_s
+        self.ready: deque[list] = deque(maxlen=1)
+        self._seq: int | None = None
+        self._block: list = []
+        self._due: float | None = None
+        self._last_done: int | None = None
+        self._done_at = 0.0                      # monotonic time _last_done finished
+
+    @property
+    def pending(self) -> bool:
+        return self._due is not None
+
+    def add(self, ev: DivergenceEvent) -> None:
+        seq = ev.sequence
+        last = self._last_done
+        if last is not None and seq <= last:
+            if seq == last or monotonic() < self._done_at + self.debounce_s:
+                return  # straggler of a block already handed out (or dropped)
+            self._last_done = None  # counter went back long after that block: indicator restarted
+        if self._seq is None or seq > self._seq:
+            self._seq, self._block = seq, []
+        elif seq < self._seq:
+            return
+        self._block.append(ev)
+        self._due = monotonic() + self.debounce_s
+
+    def end(self, seq: int) -> None:
+        if seq == self._seq:
+            self._finish()
+
+    def flush_due(self, now: float) -> None:
+        if self._due is not None and now >= self._due:
+            self._finish()
+
+    def ms_until_due(self, now: float) -> float | None:
+        """Milliseconds until the pending block is due (None if nothing is pending)."""
+        if self._due is None:
+            return None
+        return max(0.0, (self._due - now) * 1000.0)
+
+    def _finish(self) -> None:
+        if self._block:
+            self.ready.append(self._block)
+        self._last_done, self._done_at = self._seq, monotonic()
+        self._seq, self._block, self._due = None, [], None
@@ -1,10 +1,11 @@
 ﻿# CatchData/playwright_session.py
 from pathlib import Path
-from collections import defaultdict
+from threading import Event
 from time import monotonic
-from playwright.sync_api import sync_playwright
-from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import utils
-from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_highs_lows_15m_batch as bybit
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import console_parser, latency
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData.block_assembler import BlockAssembler
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_preprocessor
 
 PROFILE_DIR = Path(r"C:\Users\Anwender\PlaywrightProfiles\aggr")
 URL = "https://charts.aggr.trade/koenzv4"
@@ -13,28 +14,34 @@ PREFIX = "[AGGR INDICATOR]"
 # internal flag so we warm Bybit exactly once
 _BYBIT_WARMED = False
 
+# page of the running iter_blocks_latest() session (for pump_until)
+_PAGE = None
+
 
 def load_bybit_markets_once() -> None:
     """
-    Load Bybit markets exactly once for this process.
-    Prints the spinner & 'Loading markets done. ✅' lines from bybit.init_bybit_public().
+    Load Bybit markets exactly once for this process (on the async enrichment worker).
+    Prints the 'Loading markets done. ✅' line from bybit.init_bybit_public_async().
     """
     global _BYBIT_WARMED
     if _BYBIT_WARMED:
         return
-    bybit.init_bybit_public()
+    bybit_preprocessor.warm()
     _BYBIT_WARMED = True
 
 
 def iter_blocks_latest(debounce_ms: int = 80):
     """
     Stream ONLY the latest complete block.
-    - Coalesces events by sequence.
+    - Coalesces events by sequence in the console callback (BlockAssembler).
     - Always jumps to the highest sequence (tail-drop).
-    - Waits a tiny debounce so all events of that sequence arrive.
+    - A block is complete once its last event is `debounce_ms` old, or at once on an
+      end-of-sequence marker. Between blocks the loop sleeps inside Playwright until the
+      next divergence event instead of polling.
     """
+    global _PAGE
     PROFILE_DIR.mkdir(parents=True, exist_ok=True)
-    debounce_s = debounce_ms / 1000.0
+    asm = BlockAssembler(debounce_ms / 1000.0)
 
     with sync_playwright() as pw:
         context = pw.chromium.launch_persistent_context(
@@ -42,10 +49,7 @@ def iter_blocks_latest(debounce_ms: int = 80):
             headless=False,
         )
         page = context.new_page()
-
-        buffers: dict[int, list] = defaultdict(list)  # seq -> list[evt]
-        touched_at: dict[int, float] = {}            # seq -> last update time
-        last_yielded: int | None = None
+        _PAGE = page
 
         def _on_console(msg):
             try:
@@ -53,16 +57,15 @@ def iter_blocks_latest(debounce_ms: int = 80):
             except Exception:
                 raw_text = str(msg)
 
-            ok, payload = utils.extract_payload(raw_text, PREFIX)
-            if not ok or not isinstance(payload, dict):
+            rec = console_parser.parse(raw_text, PREFIX)
+            if rec is None:
                 return
-            if not utils.is_divergence_event(payload):
+            if rec.kind == console_parser.SEQUENCE_END:
+                asm.end(rec.sequence)
                 return
 
-            seq = payload.get("sequence")
-            if isinstance(seq, int):
-                buffers[seq].append(payload)
-                touched_at[seq] = monotonic()
+            latency.mark("capture", rec.event)
+            asm.add(rec.event)
 
         page.on("console", _on_console)
 
@@ -76,39 +79,60 @@ def iter_blocks_latest(debounce_ms: int = 80):
             page.evaluate(f"console.log('{PREFIX} __probe__ console-wired')")
 
             while True:
-                if not buffers:
-                    page.wait_for_timeout(50)
-                    continue
-
-                # Jump straight to the newest sequence we’ve seen.
-                newest = max(buffers.keys())
-
-                # Small debounce so all events for `newest` arrive
-                # (especially when multiple threads emit for the same seq).
-                if monotonic() - touched_at.get(newest, 0.0) < debounce_s:
-                    page.wait_for_timeout(10)
+                asm.flush_due(monotonic())
+                if asm.ready:
+                    block = asm.ready.popleft()
+                    latency.mark("dequeue", block)
+                    yield block
                     continue
 
-                # Yield only the newest and drop everything older.
-                block = buffers.pop(newest, [])
-                touched_at.pop(newest, None)
-                # hard drop older sequences to avoid backlog
-                for k in list(buffers.keys()):
-                    if k < newest:
-                        buffers.pop(k, None)
-                        touched_at.pop(k, None)
-
-                if block and newest != last_yielded:
-                    last_yielded = newest
-                    yield block
+                # Sleep inside Playwright (console callbacks keep firing) until the first
+                # event of a new block arrives, or the pending block is due / closed by an
+                # end marker. _on_console is registered first, so it runs before `wake`.
+                wait_ms = asm.ms_until_due(monotonic())
+                if wait_ms is None:
+                    wake = lambda _msg: asm.pending or bool(asm.ready)
+                    timeout = 0  # no timeout: idle until the indicator speaks
+                elif wait_ms > 0:
+                    wake = lambda _msg: bool(asm.ready)
+                    timeout = wait_ms
                 else:
-                    page.wait_for_timeout(10)
+                    continue
+                try:
+                    page.wait_for_event("console", predicate=wake, timeout=timeout)
+                except PlaywrightTimeoutError:
+                    pass  # debounce elapsed
 
         finally:
+            _PAGE = None
             try:
                 context.close()
             except Exception:
                 pass
 
+def pump_until(fut, poll_ms: int = 10):
+    """
+    Wait for a concurrent Future (e.g. bybit_preprocessor.submit) while keeping Playwright
+    dispatching console events, so the block buffers keep filling during enrichment.
+    Call from the thread that iterates iter_blocks_latest().
+    Completion is signalled by a done-callback and checked on every console message, so a
+    chatty indicator wakes us right after the result lands. Sync Playwright only runs its loop
+    inside a page call on this thread and has no public wait on a foreign Future, so
+    `poll_ms` stays as the fallback for a quiet console.
+    """
+    if _PAGE is None or fut.done():
+        return fut.result()
+    done = Event()
+    fut.add_done_callback(lambda _f: done.set())
+    wake = lambda _msg: done.is_set()
+    while not done.is_set():
+        if _PAGE is None:
+            return fut.result()
+        try:
+            _PAGE.wait_for_event("console", predicate=wake, timeout=max(poll_ms, 1))  # 0 would mean no timeout
+        except PlaywrightTimeoutError:
+            pass  # quiet console: re-check the flag
+    return fut.result()
+
 # Backward-compatible alias if you call iter_blocks() elsewhere:
 iter_blocks = iter_blocks_latest
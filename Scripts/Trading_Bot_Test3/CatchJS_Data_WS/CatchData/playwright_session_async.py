@@ -0,0 +1,76 @@
+# CatchData/playwright_session_async.py
+# Capture stage of the async producer (main_async.py): playwright.async_api page, console events
+# assembled into blocks by block_assembler.BlockAssembler, finished blocks pushed to a StageQueue.
+from __future__ import annotations
+
+import asyncio
+from time import monotonic
+from typing import Optional
+
+from playwright.async_api import async_playwright
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData.block_assembler import BlockAssembler
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData.playwright_session import PROFILE_DIR, URL, PREFIX
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import console_parser, latency
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.stage_queue import StageQueue
+
+
+async def capture_blocks(out: StageQueue, *, debounce_ms: int = 80, ready: Optional[asyncio.Event] = None) -> None:
+    """
+    Run the aggr page and feed complete blocks into `out` until cancelled.
+    Blocks are closed by a loop timer at their debounce deadline (or at once on an
+    end-of-sequence marker); nothing polls. `ready` is set once the page is listening.
+    """
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    asm = BlockAssembler(debounce_ms / 1000.0)
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def _drain() -> None:
+        while asm.ready:
+            out.put_nowait(asm.ready.popleft())
+
+    def _tick() -> None:
+        nonlocal timer
+        timer = None
+        asm.flush_due(monotonic())
+        _drain()
+        wait_ms = asm.ms_until_due(monotonic())
+        if wait_ms is not None:  # deadline moved while we slept
+            timer = loop.call_later(wait_ms / 1000.0, _tick)
+
+    def _on_console(msg) -> None:
+        nonlocal timer
+        rec = console_parser.parse(msg.text, PREFIX)
+        if rec is None:
+            return
+        if rec.kind == console_parser.SEQUENCE_END:
+            asm.end(rec.sequence)
+            _drain()
+            return
+
+        latency.mark("capture", rec.event)
+        asm.add(rec.event)
+        if timer is None:
+            timer = loop.call_later(asm.debounce_s, _tick)
+
+    async with async_playwright() as pw:
+        context = await pw.chromium.launch_persistent_context(
+            user_data_dir=str(PROFILE_DIR),
+            headless=False,
+        )
+        try:
+            page = await context.new_page()
+            page.on("console", _on_console)
+            await page.goto(URL)
+            print("🟢 Listening… prefix:", PREFIX)
+            await page.evaluate(f"console.log('{PREFIX} __probe__ console-wired')")
+            if ready is not None:
+                ready.set()
+            await asyncio.Future()  # callbacks + timers do the work
+        finally:
+            if timer is not None:
+                timer.cancel()
+            try:
+                await context.close()
+            except Exception:
+                pass
@@ -1,23 +1,48 @@
 ﻿# bybit_highs_lows_15m_batch.py
-# Replace L1/L2 with Bybit 15m lows (−1h aggr→Bybit) and insert H1 high after L2.
+# Replace L1/L2 with Bybit lows at each event's tf_sec (−1h aggr→Bybit) and insert H1 high after L2.
+# One base series per symbol (15m by default) is fetched; higher timeframes are resampled from it.
 # Reuses fully-enriched results when thread_id or pair_id matches a prior entry.
 # Includes lightweight cache metrics + optional debug logs.
+# Candles are served from the on-disk CandleStore first; only head/tail gaps hit Bybit.
+# process_async() is the asyncio twin built on ccxt.async_support.
+# Concurrent fetches of overlapping windows are coalesced (single-flight) so Bybit sees one request.
+# Works on DivergenceEvent records end to end; enrichment sets their fields, no dict rebuilding.
 
 from __future__ import annotations
 
+import asyncio
+import atexit
 import json
+import os
+import sys
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 from threading import Thread, Event, Lock
 from typing import Any, Dict, List, Tuple, Optional
 
 import ccxt
+import ccxt.async_support as ccxt_async
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData.candle_store import CandleStore, default_store
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData.candle_series import CandleSeries, CandleWindow, resample
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent, events_from_dicts
 
 # -------------------- config --------------------
 DEFAULT_TYPE = "future"
 QUOTE = "USDT"
 CONTRACT_SUFFIX = ":USDT"
-TF = "15m"
+TF = "15m"                         # preferred base series; also the default for events without tf_sec
+DEFAULT_TICKER = "BTC"             # used when an event carries no symbol/ticker
+TICKER_ALIASES: Dict[str, str] = {"XBT": "BTC"}  # aggr/other venue names -> Bybit base
+MAX_FETCH_WORKERS = 4              # concurrent symbol fetches per block
 AGGR_BYBIT_HOUR_SHIFT_MS = -3_600_000  # -1h
+STORE_MAX_BACKFILL_BARS = 500      # bars fetched outside a window to keep the candle file contiguous
+CACHE_MAX_ENTRIES = 5_000          # LRU bound for PivotCache
+CACHE_TTL_S: float | None = None   # per-entry time-to-live (None = never expire)
+# warm-start snapshot of enriched pivots (.../Trading_Bot_Test3/data/pivot_cache.jsonl)
+CACHE_SNAPSHOT_PATH = Path(__file__).resolve().parents[2] / "data" / "pivot_cache.jsonl"
 
 # -------------------- debug & metrics --------------------
 DEBUG = False
@@ -25,9 +50,18 @@ _METRICS = {
     "cache_puts": 0,
     "cache_hit_thread": 0,
     "cache_hit_pair": 0,
+    "cache_misses": 0,
+    "cache_evictions": 0,  # entries dropped by the LRU bound
+    "cache_expired": 0,    # entries dropped because their TTL ran out
     "reused_items": 0,
     "computed_items": 0,
     "fetch_calls": 0,  # how many OHLCV-range fetches we performed
+    "fetch_coalesced": 0,  # range requests that waited on another caller's in-flight fetch
+    "store_hits": 0,   # candle windows served entirely from the on-disk store
+    "store_written": 0,  # closed candles appended to the on-disk store
+    "store_detached": 0, # windows too far from the stored range to back-fill (fetched alone)
+    "window_hits": 0,    # blocks served entirely from the in-memory candle window
+    "window_evicted": 0, # bars dropped because they predate every live pivot
 }
 
 def enable_cache_debug(flag: bool = True):
@@ -35,9 +69,17 @@ def enable_cache_debug(flag: bool = True):
     global DEBUG
     DEBUG = bool(flag)
 
-def cache_stats() -> dict:
-    """Return a shallow copy of current metrics."""
-    return dict(_METRICS)
+def cache_stats(cache: "PivotCache | None" = None) -> dict:
+    """Return a shallow copy of current metrics plus live cache size / hit ratio.
+    Pass the cache given to process() when it isn't the module's default one."""
+    cache = _CACHE if cache is None else cache
+    out = dict(_METRICS)
+    hits = out["cache_hit_thread"] + out["cache_hit_pair"]
+    lookups = hits + out["cache_misses"]
+    out["cache_hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+    out["cache_entries"] = len(cache)
+    out["cache_bytes"] = cache.bytes_estimate
+    return out
 
 def reset_cache_stats():
     """Reset metrics counters."""
@@ -82,12 +124,56 @@ def symbol_for(ticker: str) -> str:
         raise TypeError(f"ticker must be str, got {type(ticker).__name__}")
     return f"{ticker.strip().upper()}/{QUOTE}{CONTRACT_SUFFIX}"
 
+def ticker_for(ev: DivergenceEvent, default: str = DEFAULT_TICKER) -> str:
+    """
+    Base ticker of an event: 'ticker' / 'symbol' / 'market' field, else `default`.
+    Accepts 'BTC', 'BTCUSDT', 'BYBIT:BTCUSDT', 'BTC/USDT:USDT'.
+    """
+    raw = ev.get_extra("ticker") or ev.get_extra("symbol") or ev.get_extra("market")
+    if not isinstance(raw, str) or not raw.strip():
+        return default
+    t = raw.strip().upper()
+    if "/" in t:
+        t = t.split("/", 1)[0]
+    elif ":" in t:
+        t = t.split(":", 1)[1]
+    for quote in ("USDT", "USDC", "USD", "PERP"):
+        if t.endswith(quote) and len(t) > len(quote):
+            t = t[:-len(quote)]
+            break
+    return TICKER_ALIASES.get(t, t)
+
+# -------------------- shared rate gate --------------------
+class _RateGate:
+    """Spaces request starts across threads by the exchange's rateLimit (ms).
+    Sync clients must not throttle themselves on top (ccxt's sync limiter isn't thread-safe
+    anyway: it reads lastRestRequestTimestamp unlocked), see _gate_only()."""
+    def __init__(self):
+        self._lock = Lock()
+        self._next = 0.0
+
+    def wait(self, rate_limit_ms: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + rate_limit_ms / 1000.0
+        if start > now:
+            time.sleep(start - now)
+
+_RATE_GATE = _RateGate()
+
+def _gate_only(ex):
+    """Turn off the client's own limiter so _RATE_GATE is the only wait per request."""
+    if getattr(ex, "enableRateLimit", False):
+        ex.enableRateLimit = False
+    return ex
+
 def init_bybit_public() -> ccxt.bybit:
     """Thread-safe singleton; loads markets once (with spinner + done message)."""
     global _EX_SINGLETON, _MARKETS_LOADED
     with _EX_LOCK:
         if _EX_SINGLETON is None:
-            ex = ccxt.bybit({"enableRateLimit": True})
+            ex = ccxt.bybit({"enableRateLimit": False})  # paced by _RATE_GATE
             ex.options["defaultType"] = DEFAULT_TYPE
             print("Loading markets (Bybit | public)…")
             with_spinner("Loading markets", ex.load_markets, done_message="Loading markets done. ✅")
@@ -97,11 +183,55 @@ def init_bybit_public() -> ccxt.bybit:
             print("Loading markets (Bybit | public)…")
             with_spinner("Loading markets", _EX_SINGLETON.load_markets, done_message="Loading markets done. ✅")
             _MARKETS_LOADED = True
-        return _EX_SINGLETON
+    _CACHE.load_snapshot_once()
+    return _EX_SINGLETON
+
+def use_exchange(ex=None, *, async_ex=None) -> None:
+    """
+    Plug an exchange backend in place of live Bybit (e.g. Replay/fake_exchange.FakeExchange).
+    Anything with ccxt's fetch_ohlcv(symbol, timeframe=, since=, limit=) works; `async_ex`
+    serves process_async(). Pass None to fall back to the public ccxt clients on next init.
+    In-memory candle windows are dropped so no bars leak between backends.
+    A sync ccxt client gets enableRateLimit turned off: _RATE_GATE paces its requests.
+    """
+    global _EX_SINGLETON, _MARKETS_LOADED, _AEX_SINGLETON
+    with _EX_LOCK:
+        _EX_SINGLETON = _gate_only(ex) if ex is not None else None
+        _MARKETS_LOADED = ex is not None
+    _AEX_SINGLETON = async_ex
+    reset_windows()
 
 # -------------------- candle utils --------------------
+# Bybit-native timeframes (ccxt labels) -> bar length in ms
+_NATIVE_TF_MS: Dict[str, int] = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "12h": 43_200_000, "1d": 86_400_000,
+}
+
 def _step_ms(timeframe: str) -> int:
-    return {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000}[timeframe]
+    return _NATIVE_TF_MS[timeframe]
+
+def _event_step_ms(ev: DivergenceEvent) -> int:
+    """Bar length the event's divergence was detected on (tf_sec), default TF."""
+    try:
+        sec = int(ev.tf_sec or 0)
+    except (TypeError, ValueError):
+        sec = 0
+    return sec * 1000 if sec > 0 else _step_ms(TF)
+
+def _base_tf_for(steps) -> str:
+    """
+    Native timeframe to fetch so every needed step can be resampled from it:
+    TF when it divides them all, else the coarsest native timeframe that does.
+    """
+    steps = list(steps)
+    if all(st % _step_ms(TF) == 0 for st in steps):
+        return TF
+    for tf, ms in sorted(_NATIVE_TF_MS.items(), key=lambda kv: -kv[1]):
+        if all(st % ms == 0 for st in steps):
+            return tf
+    raise ValueError(f"no Bybit timeframe divides {sorted(set(steps))} ms")
 
 def _fetch_ohlcv_range(ex, symbol, timeframe, start_ms, end_ms, limit=1000, *, progress: bool = False):
     """
@@ -117,6 +247,7 @@ def _fetch_ohlcv_range(ex, symbol, timeframe, start_ms, end_ms, limit=1000, *, p
         out, since = [], start_ms
         step = _step_ms(timeframe)
         while since <= end_ms:
+            _RATE_GATE.wait(getattr(ex, "rateLimit", 0) or 0)  # thread-safe pacing across symbols
             batch = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
             if not batch:
                 break
@@ -131,7 +262,6 @@ def _fetch_ohlcv_range(ex, symbol, timeframe, start_ms, end_ms, limit=1000, *, p
             since = nxt
             if len(batch) < limit:
                 break
-            time.sleep(0.01)  # tiny pause; ccxt also rate-limits
         return out
 
     if progress:
@@ -139,203 +269,668 @@ def _fetch_ohlcv_range(ex, symbol, timeframe, start_ms, end_ms, limit=1000, *, p
     else:
         return _do_fetch()
 
+# -------------------- single-flight OHLCV fetches --------------------
+class _SingleFlight:
+    """
+    In-flight OHLCV ranges per (symbol, timeframe). A caller claims the parts of its
+    (bar-aligned) range nobody is fetching yet and waits on the futures covering the rest,
+    so overlapping concurrent requests hit Bybit once. Works across threads and event loops
+    (concurrent.futures.Future; async callers wrap them).
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._inflight: Dict[Tuple[str, str], List[Tuple[int, int, Future]]] = {}
+
+    def claim(self, symbol: str, timeframe: str, start_ms: int, end_ms: int
+              ) -> Tuple[List[Tuple[int, int, Future]], List[Future]]:
+        """(own segments to fetch + their futures, futures of overlapping in-flight fetches)."""
+        step = _step_ms(timeframe)
+        with self._lock:
+            flights = self._inflight.setdefault((symbol, timeframe), [])
+            segments = [(start_ms, end_ms)]
+            waits: List[Future] = []
+            for f_start, f_end, fut in flights:
+                if f_end < start_ms or f_start > end_ms:
+                    continue
+                waits.append(fut)
+                rest: List[Tuple[int, int]] = []
+                for s0, e0 in segments:
+                    if s0 < f_start:
+                        rest.append((s0, min(e0, f_start - step)))
+                    if e0 > f_end:
+                        rest.append((max(s0, f_end + step), e0))
+                segments = [(s0, e0) for s0, e0 in rest if s0 <= e0]
+            own = [(s0, e0, Future()) for s0, e0 in segments]
+            flights.extend(own)
+        return own, waits
+
+    def release(self, symbol: str, timeframe: str, fut: Future) -> None:
+        with self._lock:
+            flights = self._inflight.get((symbol, timeframe), [])
+            flights[:] = [f for f in flights if f[2] is not fut]
+
+_FLIGHTS = _SingleFlight()
+
+def _aligned(timeframe: str, start_ms: int, end_ms: int) -> Tuple[int, int]:
+    step = _step_ms(timeframe)
+    return (start_ms // step) * step, (end_ms // step) * step
+
+def _join_rows(parts, start_ms: int, end_ms: int) -> list[list]:
+    by_ts = {int(c[0]): c for part in parts for c in part if start_ms <= c[0] <= end_ms}
+    return [by_ts[k] for k in sorted(by_ts)]
+
+def _fetch_ohlcv_shared(ex, symbol, timeframe, start_ms, end_ms, limit=1000, *, progress: bool = False):
+    """_fetch_ohlcv_range behind the single-flight layer (sync callers)."""
+    start_ms, end_ms = _aligned(timeframe, start_ms, end_ms)
+    own, waits = _FLIGHTS.claim(symbol, timeframe, start_ms, end_ms)
+    _METRICS["fetch_coalesced"] += bool(waits)
+    parts = []
+    try:
+        for s0, e0, fut in own:  # fetch own parts first, so waiting can never deadlock
+            rows = _fetch_ohlcv_range(ex, symbol, timeframe, s0, e0, limit, progress=progress)
+            fut.set_result(rows)
+            parts.append(rows)
+    except BaseException as e:
+        for _s, _e, fut in own:
+            if not fut.done():
+                fut.set_exception(e)
+        raise
+    finally:
+        for _s, _e, fut in own:
+            _FLIGHTS.release(symbol, timeframe, fut)
+    parts.extend(f.result() for f in waits)
+    return _join_rows(parts, start_ms, end_ms)
+
+def _store_gaps(store: CandleStore, symbol, timeframe, start_ms, end_ms) -> list[tuple[int, int]]:
+    """
+    Head/tail ranges of [start_ms, end_ms] the on-disk store does not cover yet.
+    A gap reaches outside the window to stay contiguous with the file, by at most
+    STORE_MAX_BACKFILL_BARS; a window further away (e.g. after a long downtime) is fetched alone.
+    """
+    step = _step_ms(timeframe)
+    bounds = store.bounds(symbol, timeframe)
+    if bounds is None:
+        return [(start_ms, end_ms)]
+    first, last = bounds
+    max_gap = STORE_MAX_BACKFILL_BARS * step
+    if first - end_ms > max_gap or start_ms - last > max_gap:
+        _METRICS["store_detached"] += 1
+        return [(start_ms, end_ms)]  # merge() restarts the file at it (tail) or doesn't keep it (head)
+    gaps: list[tuple[int, int]] = []
+    if start_ms < first:
+        gaps.append((start_ms, first - step))  # contiguous with the stored head
+    if end_ms > last:
+        gaps.append((last + step, end_ms))     # contiguous with the stored tail
+    return gaps
+
+def _store_merge(store: CandleStore, symbol, timeframe, start_ms, end_ms, fetched: list[list]) -> list[list]:
+    """Persist fetched gap bars, then return stored + fresh bars for [start_ms, end_ms]."""
+    step = _step_ms(timeframe)
+    _METRICS["store_written"] += store.merge(symbol, timeframe, fetched, step,
+                                             max_gap_ms=STORE_MAX_BACKFILL_BARS * step)
+    # stored bars + fresh gap bars (the open bar is only ever in `fetched`)
+    by_ts = {int(c[0]): c for c in store.read_range(symbol, timeframe, start_ms, end_ms)}
+    for c in fetched:
+        if start_ms <= c[0] <= end_ms:
+            by_ts[int(c[0])] = c
+    return [by_ts[k] for k in sorted(by_ts)]
+
+def _candles_for_range(ex, symbol, timeframe, start_ms, end_ms, *, progress: bool = False,
+                       store: CandleStore | None = None) -> list[list]:
+    """
+    Candles for [start_ms, end_ms], consulting the on-disk store first.
+    Only the missing head (before the first stored bar) and tail (after the last stored bar)
+    are fetched; closed bars from those gaps are appended so the next run needs no REST call.
+    """
+    store = store or default_store()
+    gaps = _store_gaps(store, symbol, timeframe, start_ms, end_ms)
+    if not gaps:
+        _METRICS["store_hits"] += 1
+        return store.read_range(symbol, timeframe, start_ms, end_ms)
+
+    fetched: list[list] = []
+    for g_start, g_end in gaps:
+        fetched.extend(_fetch_ohlcv_shared(ex, symbol, timeframe, g_start, g_end, limit=1000, progress=progress))
+    return _store_merge(store, symbol, timeframe, start_ms, end_ms, fetched)
+
+# -------------------- rolling candle windows --------------------
+_WINDOWS_LOCK = Lock()
+_WINDOWS: Dict[Tuple[str, str], CandleWindow] = {}
+
+def _window_for(symbol: str, timeframe: str) -> CandleWindow:
+    with _WINDOWS_LOCK:
+        w = _WINDOWS.get((symbol, timeframe))
+        if w is None:
+            w = _WINDOWS[(symbol, timeframe)] = CandleWindow(_step_ms(timeframe))
+        return w
+
+def reset_windows():
+    """Forget all in-memory candle windows (next block refills from store/exchange)."""
+    with _WINDOWS_LOCK:
+        _WINDOWS.clear()
+
+def _window_candles(ex, symbol, timeframe, start_ms, end_ms, *, oldest_live_ms: int,
+                    progress: bool = False, store: CandleStore | None = None) -> list[list]:
+    """
+    Candles for [start_ms, end_ms] from the rolling window; only the uncovered delta is
+    requested (store first, then exchange). Bars older than the oldest live pivot are evicted.
+    """
+    step = _step_ms(timeframe)
+    w = _window_for(symbol, timeframe)
+    gaps = w.missing(start_ms, end_ms)
+    if not gaps:
+        _METRICS["window_hits"] += 1
+    now_ms = int(time.time() * 1000)
+    for g_start, g_end in gaps:
+        rows = _candles_for_range(ex, symbol, timeframe, g_start, g_end, progress=progress, store=store)
+        w.add(rows, g_start, g_end, now_ms=now_ms)
+    _METRICS["window_evicted"] += w.evict_before(_bucket_open(oldest_live_ms, step) - step)
+    return w.slice(start_ms, end_ms)
+
 def _bucket_open(ts_ms: int, step_ms: int) -> int:
     return (ts_ms // step_ms) * step_ms
 
-def _low_for_ts(candles: list[list], ts_ms: int, step_ms: int) -> float:
-    bo = _bucket_open(ts_ms, step_ms)
-    for o, _o, _h, l, _c, _v in candles:
-        if o == bo:
-            return float(l)
-    for o, _o, _h, l, _c, _v in candles:
-        if o <= ts_ms < o + step_ms:
-            return float(l)
-    raise RuntimeError(f"{TF} candle not found for ts={ts_ms}")
-
-def _h1_high_between(candles: list[list], start_ms: int, end_ms: int) -> tuple[float, int]:
-    w = [c for c in candles if start_ms <= c[0] <= end_ms]
-    if not w:
-        raise RuntimeError("No candles in L1→L2 window")
-    hi = max(w, key=lambda r: r[2])
-    return float(hi[2]), int(hi[0])
-
 def aggr_bybit_minus_1h(ts_ms: int) -> int:
     return ts_ms + AGGR_BYBIT_HOUR_SHIFT_MS
 
-def _with_h1_after_l2(s: dict, *, l1_low: float, l2_low: float, h1_price: float, h1_ts_ms: int) -> dict:
-    """Return a new dict where H1 appears immediately after L2 (readability)."""
-    out: Dict[str, Any] = {}
-    for k in s.keys():
-        if k == "L1":
-            out["L1"] = {**s["L1"], "price": l1_low}
-        elif k == "L2":
-            out["L2"] = {**s["L2"], "price": l2_low}
-            out["H1"] = {"time": h1_ts_ms // 1000, "price": h1_price}
-        elif k == "H1":
-            continue
-        else:
-            out[k] = s[k]
-    if "L1" not in out:
-        out["L1"] = {**s.get("L1", {}), "price": l1_low}
-    if "L2" not in out:
-        out["L2"] = {**s.get("L2", {}), "price": l2_low}
-        out["H1"] = {"time": h1_ts_ms // 1000, "price": h1_price}
-    return out
-
 # -------------------- Reuse/Caching Layer (exact-id reuse only) --------------
+def _approx_size(obj: Any) -> int:
+    """Rough deep size of an event / JSON-like item (slots/dict/list/scalars) in bytes."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, DivergenceEvent):
+        size += sum(_approx_size(getattr(obj, f)) for f in DivergenceEvent.__slots__)
+    elif isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + _approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_size(v) for v in obj)
+    return size
+
 class PivotCache:
-    """Minimal cache for previously computed pivots keyed by thread_id/pair_id."""
-    def __init__(self):
-        self._by_thread: Dict[str, Dict[str, Any]] = {}
-        self._by_pair: Dict[str, Dict[str, Any]] = {}
+    """
+    Bounded cache for previously computed pivots keyed by thread_id/pair_id.
+      - LRU: at most `max_entries` items; the least recently used one is evicted first.
+      - TTL: entries older than `ttl_s` are dropped on access (None = keep until evicted).
+    One entry is shared by both indexes, so a thread_id and its pair_id evict together.
+    With `snapshot_path`, entries survive restarts: schedule_snapshot() rewrites the JSON-lines
+    file atomically on a background thread and load_snapshot_once() warm-starts from it.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_s: float | None = CACHE_TTL_S,
+                 *, snapshot_path: Optional[Path] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = ttl_s
+        self.snapshot_path = Path(snapshot_path) if snapshot_path is not None else None
+        self._lock = Lock()
+        self._snap_lock = Lock()
+        self._snap_thread: Optional[Thread] = None
+        self._dirty = False
+        self._loaded = False
+        # key -> (item, expires_at | None, size_bytes); order = recency (last = newest)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[DivergenceEvent, float | None, int]]" = OrderedDict()
+        self._by_thread: Dict[str, Tuple[str, str]] = {}
+        self._by_pair: Dict[str, Tuple[str, str]] = {}
+        self.bytes_estimate = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- internals (call with lock held) ----------
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _item, _exp, size = self._entries.pop(key)
+        self.bytes_estimate -= size
+        tid, pid = key
+        if tid and self._by_thread.get(tid) == key:
+            del self._by_thread[tid]
+        if pid and self._by_pair.get(pid) == key:
+            del self._by_pair[pid]
 
-    def put(self, item: Dict[str, Any]) -> None:
-        tid = item.get("thread_id")
-        pid = item.get("pair_id")
+    def _live(self, key: Optional[Tuple[str, str]]) -> Optional[DivergenceEvent]:
+        if key is None or key not in self._entries:
+            return None
+        item, expires_at, _size = self._entries[key]
+        if expires_at is not None and time.time() >= expires_at:
+            self._drop(key)
+            _METRICS["cache_expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return item
+
+    def _insert(self, key: Tuple[str, str], item: DivergenceEvent, expires_at: float | None) -> None:
+        tid, pid = key
+        for old in {key, self._by_thread.get(tid), self._by_pair.get(pid)}:
+            if old is not None and old in self._entries:
+                self._drop(old)
+        size = _approx_size(item)
+        self._entries[key] = (item, expires_at, size)
+        self.bytes_estimate += size
         if tid:
-            self._by_thread[tid] = item
+            self._by_thread[tid] = key
         if pid:
-            self._by_pair[pid] = item
+            self._by_pair[pid] = key
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            _METRICS["cache_evictions"] += 1
+
+    # ---------- public ----------
+    def put(self, item: DivergenceEvent) -> None:
+        tid = item.thread_id
+        pid = item.pair_id
+        if not tid and not pid:
+            return
+        key = (tid or "", pid or "")
+        expires_at = time.time() + self.ttl_s if self.ttl_s else None
+        with self._lock:
+            self._insert(key, item, expires_at)
+            self._dirty = True
         _METRICS["cache_puts"] += 1
         if DEBUG:
             print(f"[cache] put tid={tid} pid={pid}")
 
-    def get_by_thread(self, thread_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    def get_by_thread(self, thread_id: Optional[str]) -> Optional[DivergenceEvent]:
         if not thread_id:
             return None
-        hit = self._by_thread.get(thread_id)
+        with self._lock:
+            hit = self._live(self._by_thread.get(thread_id))
         if hit is not None:
             _METRICS["cache_hit_thread"] += 1
             if DEBUG:
                 print(f"[cache] HIT(thread) {thread_id}")
         return hit
 
-    def get_by_pair(self, pair_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    def get_by_pair(self, pair_id: Optional[str]) -> Optional[DivergenceEvent]:
         if not pair_id:
             return None
-        hit = self._by_pair.get(pair_id)
+        with self._lock:
+            hit = self._live(self._by_pair.get(pair_id))
         if hit is not None:
             _METRICS["cache_hit_pair"] += 1
             if DEBUG:
                 print(f"[cache] HIT(pair) {pair_id}")
         return hit
 
-_CACHE = PivotCache()
+    def lookup(self, thread_id: Optional[str], pair_id: Optional[str]) -> Optional[DivergenceEvent]:
+        """thread_id first, then pair_id; counts one miss if neither is cached."""
+        hit = self.get_by_thread(thread_id) or self.get_by_pair(pair_id)
+        if hit is None:
+            _METRICS["cache_misses"] += 1
+        return hit
 
-def _is_enriched(x: Dict[str, Any]) -> bool:
-    try:
-        return (
-            isinstance(x["L1"]["price"], (int, float)) and
-            isinstance(x["L2"]["price"], (int, float)) and
-            isinstance(x["H1"]["price"], (int, float)) and
-            isinstance(x["H1"]["time"], (int, float))
-        )
-    except Exception:
-        return False
-
-def plan_reuse(items: List[Dict[str, Any]], cache: PivotCache
-               ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_thread.clear()
+            self._by_pair.clear()
+            self.bytes_estimate = 0
+            self._dirty = True
+
+    # ---------- warm-start snapshot ----------
+    def snapshot(self) -> int:
+        """Write live entries (oldest→newest) as JSON lines, atomically. Returns lines written."""
+        if self.snapshot_path is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            rows = [(item, exp) for item, exp, _size in self._entries.values() if exp is None or exp > now]
+            self._dirty = False
+        path = self.snapshot_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for item, exp in rows:
+                f.write(json.dumps({"exp": exp, "item": item.to_dict()}, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+        os.replace(tmp, path)
+        if DEBUG:
+            print(f"[cache] snapshot {len(rows)} → {path}")
+        return len(rows)
+
+    def schedule_snapshot(self) -> None:
+        """Persist in the background; bursts of puts coalesce into one write."""
+        if self.snapshot_path is None or not self._dirty:
+            return
+        with self._snap_lock:
+            if self._snap_thread is not None and self._snap_thread.is_alive():
+                return  # the running writer loops until clean
+
+            def _writer():
+                while self._dirty:
+                    try:
+                        self.snapshot()
+                    except Exception as e:
+                        print(f"[cache] snapshot failed: {e}")
+                        return
+
+            self._snap_thread = Thread(target=_writer, name="pivot-cache-snapshot", daemon=True)
+            self._snap_thread.start()
+
+    def flush(self) -> None:
+        """Synchronous final write (used at exit)."""
+        t = self._snap_thread
+        if t is not None:
+            t.join(timeout=3)
+        if self._dirty:
+            self.snapshot()
+
+    def load_snapshot_once(self) -> int:
+        """Reload entries written by a previous run (skips expired lines). Returns entries loaded.
+        Runs under the cache lock: concurrent first callers load once, and none sees a half-loaded cache."""
+        with self._lock:
+            if self._loaded or self.snapshot_path is None:
+                return 0
+            self._loaded = True
+            try:
+                lines = self.snapshot_path.read_text(encoding="utf-8").splitlines()
+            except FileNotFoundError:
+                return 0
+            now = time.time()
+            n = 0
+            for line in lines[-self.max_entries:]:
+                try:
+                    row = json.loads(line)
+                    item, exp = DivergenceEvent.from_dict(row["item"]), row.get("exp")
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue  # torn/corrupt line
+                if exp is not None and exp <= now:
+                    continue
+                tid, pid = item.thread_id, item.pair_id
+                if not tid and not pid:
+                    continue
+                self._insert((tid or "", pid or ""), item, exp)
+                n += 1
+        if DEBUG:
+            print(f"[cache] warm-start loaded {n} entries from {self.snapshot_path}")
+        return n
+
+_CACHE = PivotCache(snapshot_path=CACHE_SNAPSHOT_PATH)
+atexit.register(_CACHE.flush)
+
+def plan_reuse(items: List[DivergenceEvent], cache: PivotCache
+               ) -> Tuple[List[Optional[DivergenceEvent]], List[int]]:
     """
-    Decide which items can be reused vs. need compute.
-    Returns (to_compute, reused_ready)
+    Decide which items can be reused vs. need compute, keyed by input position.
+    Returns (out, pending):
+      - out[i] is the reused item, or None when items[i] still needs compute
+      - pending lists the positions whose out[i] is None (input order)
 
     Rules:
       - If (thread_id) OR (pair_id) found in cache with enriched L1/L2/H1, reuse entirely.
       - No special handling for '❔' — anything else recomputes fully.
     """
-    to_compute: List[Dict[str, Any]] = []
-    reused: List[Dict[str, Any]] = []
-
-    for s in items:
-        prev = cache.get_by_thread(s.get("thread_id")) or cache.get_by_pair(s.get("pair_id"))
-        if prev and _is_enriched(prev):
-            reused.append({
-                **s,
-                "L1": {**s.get("L1", {}), "price": prev["L1"]["price"]},
-                "L2": {**s.get("L2", {}), "price": prev["L2"]["price"]},
-                "H1": {"time": prev["H1"]["time"], "price": prev["H1"]["price"]},
-            })
+    out: List[Optional[DivergenceEvent]] = [None] * len(items)
+    pending: List[int] = []
+
+    for i, s in enumerate(items):
+        prev = cache.lookup(s.thread_id, s.pair_id)
+        if prev is not None and prev.is_enriched:
+            out[i] = s.enriched(prev.l1_price, prev.l2_price, prev.h1_price, prev.h1_time)
             _METRICS["reused_items"] += 1
             if DEBUG:
-                print(f"[reuse] {s.get('thread_id')} | {s.get('pair_id')}")
+                print(f"[reuse] {s.thread_id} | {s.pair_id}")
+        else:
+            pending.append(i)
+
+    return out, pending
+
+def _plan_block(rawdata: List[DivergenceEvent], cache: PivotCache, ticker: Optional[str]
+                ) -> Tuple[List[Optional[DivergenceEvent]], Dict[str, List[int]], List[str]]:
+    """
+    Reuse plan for a block: (out, groups, symbols).
+      - groups: ccxt symbol -> positions that still need compute (input order)
+      - symbols[i]: ccxt symbol of rawdata[i] (`ticker` forces one symbol for the whole block)
+    """
+    cache.load_snapshot_once()  # warm start: reuse what the previous run already enriched
+    out, pending = plan_reuse(rawdata, cache)
+    symbols = [symbol_for(ticker or ticker_for(x)) for x in rawdata]
+
+    # items without both pivots can't be enriched; pass them through unchanged
+    groups: Dict[str, List[int]] = {}
+    for i in pending:
+        s = rawdata[i]
+        if s.has_pivots:
+            groups.setdefault(symbols[i], []).append(i)
         else:
-            to_compute.append(s)
+            out[i] = s
+    return out, groups, symbols
+
+def _pivot_pairs(rawdata: List[DivergenceEvent], idxs: List[int]) -> List[Tuple[int, int]]:
+    """Shifted (L1, L2) Bybit timestamps in ms for each position in idxs."""
+    return [(aggr_bybit_minus_1h(int(rawdata[i].l1_time) * 1000),
+             aggr_bybit_minus_1h(int(rawdata[i].l2_time) * 1000)) for i in idxs]
 
-    return to_compute, reused
+def _fetch_bounds(rawdata: List[DivergenceEvent], symbols: List[str], symbol: str,
+                  pairs_by_step: Dict[int, List[Tuple[int, int]]], base_step: int) -> Tuple[int, int, int]:
+    """
+    Unified base-series (start_ms, end_ms) over one symbol's compute set + its oldest live pivot.
+    Each target timeframe gets whole buckets (one bar of margin each side), so resampled
+    edge bars are complete.
+    """
+    start_ms = end_ms = None
+    for step, pairs in pairs_by_step.items():
+        all_ts = [t for pair in pairs for t in pair]
+        lo = _bucket_open(min(all_ts), step) - step
+        hi = _bucket_open(max(all_ts), step) + 2 * step - base_step  # last base bar of the next bucket
+        start_ms = lo if start_ms is None else min(start_ms, lo)
+        end_ms = hi if end_ms is None else max(end_ms, hi)
+    # oldest pivot still referenced by this block (reused items included) bounds the window
+    live_ts = [aggr_bybit_minus_1h(int(t) * 1000)
+               for x, sym in zip(rawdata, symbols) if sym == symbol
+               for t in (x.l1_time, x.l2_time) if t is not None]
+    widest = max(pairs_by_step)
+    # keep the whole margin bucket of the widest timeframe (window evicts one base bar earlier)
+    oldest_live_ms = _bucket_open(min(live_ts), widest) - widest + base_step
+    return start_ms, end_ms, oldest_live_ms
+
+def _split_by_step(rawdata: List[DivergenceEvent], idxs: List[int]
+                   ) -> Tuple[Dict[int, List[int]], Dict[int, List[Tuple[int, int]]]]:
+    """positions and shifted pivot pairs per target bar length (ms)."""
+    by_step: Dict[int, List[int]] = {}
+    for i in idxs:
+        by_step.setdefault(_event_step_ms(rawdata[i]), []).append(i)
+    return by_step, {st: _pivot_pairs(rawdata, ix) for st, ix in by_step.items()}
+
+def _apply_timeframes(rawdata: List[DivergenceEvent], out: List[Optional[DivergenceEvent]],
+                      by_step: Dict[int, List[int]], pairs_by_step: Dict[int, List[Tuple[int, int]]],
+                      candles: list[list], base_step: int, cache: PivotCache) -> None:
+    """Resample the base series once per target timeframe and resolve those items against it."""
+    for step, idxs in by_step.items():
+        bars = candles if step == base_step else resample(candles, step)
+        _apply_resolved(rawdata, out, idxs, pairs_by_step[step], bars, step, cache)
+
+def _apply_resolved(rawdata: List[DivergenceEvent], out: List[Optional[DivergenceEvent]],
+                    idxs: List[int], pairs: List[Tuple[int, int]], candles: list[list],
+                    step: int, cache: PivotCache) -> None:
+    """Resolve L1/L2 lows + H1 highs for one symbol's items in one pass, straight into position."""
+    series = CandleSeries(candles, step)
+    for i, (l1_low, l2_low, h1_price, h1_ts) in zip(idxs, series.resolve_pivots(pairs)):
+        s2 = rawdata[i].enriched(l1_low, l2_low, h1_price, h1_ts // 1000)
+        out[i] = s2
+        cache.put(s2)  # update cache with fully enriched entry
+    _METRICS["computed_items"] += len(idxs)
 
 # -------------------- public API --------------------
-def process(rawdata: List[Dict[str, Any]], *, ticker: str = "BTC", progress: bool = False,
-            cache: PivotCache = _CACHE) -> List[Dict[str, Any]]:
+def process(rawdata: List[DivergenceEvent], *, ticker: Optional[str] = None, progress: bool = False,
+            cache: PivotCache = _CACHE, store: CandleStore | None = None) -> List[DivergenceEvent]:
     """
-    Replace L1/L2 with Bybit 15m lows (−1h aggr→Bybit) and insert H1 high after L2.
+    Replace L1/L2 with Bybit lows (−1h aggr→Bybit) and insert H1 high after L2.
+    Each event is resolved on its own tf_sec; per symbol one base series (TF if it divides
+    every tf) is fetched and higher timeframes are resampled from it.
     Reuse only when exact thread_id or pair_id matches a previously enriched entry.
-    Set progress=True to show a fetching spinner (no 'done' message).
+    Events are grouped by symbol (ticker_for, or `ticker` for the whole block) and each
+    symbol's candles are fetched on a bounded worker pool; results keep input order.
+    Set progress=True to show a fetching spinner (no 'done' message; single-symbol blocks only).
+    Candles come from the per-symbol rolling window, then `store` (default: data/candles);
+    only the uncovered delta is fetched from Bybit.
     """
     if not rawdata:
         return []
 
-    # 1) reuse decision
-    to_compute, reused_ready = plan_reuse(rawdata, cache)
+    # 1) reuse decision (results keyed by input position)
+    out, groups, symbols = _plan_block(rawdata, cache, ticker)
 
-    # 2) if nothing to compute, return reused
-    if not to_compute:
-        return reused_ready
+    # 2) if nothing to compute, return reused (+ passthrough)
+    if not groups:
+        return out
 
-    # 3) compute candles only for what's left
+    # 3) candles per symbol, only for what's left
     ex = init_bybit_public()
-    symbol = symbol_for(ticker)
-    step = _step_ms(TF)
-
-    # unified fetch window across all shifted L1/L2 (compute-only set)
-    all_ts: List[int] = []
-    for s in to_compute:
-        if "L1" in s and "L2" in s:
-            all_ts.append(aggr_bybit_minus_1h(int(s["L1"]["time"]) * 1000))
-            all_ts.append(aggr_bybit_minus_1h(int(s["L2"]["time"]) * 1000))
-
-    if not all_ts:
-        # nothing needs data; return what we have
-        for r in reused_ready:
-            if _is_enriched(r):
-                cache.put(r)
-        return reused_ready
-
-    start_ms = _bucket_open(min(all_ts), step) - step
-    end_ms   = _bucket_open(max(all_ts), step) + step
-    candles = _fetch_ohlcv_range(ex, symbol, TF, start_ms, end_ms, limit=1000, progress=progress)
-
-    computed: List[Dict[str, Any]] = []
-    for s in to_compute:
-        l1_ts = aggr_bybit_minus_1h(int(s["L1"]["time"]) * 1000)
-        l2_ts = aggr_bybit_minus_1h(int(s["L2"]["time"]) * 1000)
-
-        l1_low = _low_for_ts(candles, l1_ts, step)
-        l2_low = _low_for_ts(candles, l2_ts, step)
-        t_start, t_end = (l1_ts, l2_ts) if l1_ts <= l2_ts else (l2_ts, l1_ts)
-        h1_price, h1_ts = _h1_high_between(candles, t_start, t_end)
-
-        s2 = _with_h1_after_l2(s, l1_low=l1_low, l2_low=l2_low, h1_price=h1_price, h1_ts_ms=h1_ts)
-        computed.append(s2)
-        cache.put(s2)  # update cache with fully enriched entry
+    show = progress and len(groups) == 1
 
-    _METRICS["computed_items"] += len(computed)
+    def _enrich(symbol: str, idxs: List[int]) -> None:
+        by_step, pairs_by_step = _split_by_step(rawdata, idxs)
+        base_tf = _base_tf_for(by_step)
+        base_step = _step_ms(base_tf)
+        start_ms, end_ms, oldest_live_ms = _fetch_bounds(rawdata, symbols, symbol, pairs_by_step, base_step)
+        candles = _window_candles(ex, symbol, base_tf, start_ms, end_ms, oldest_live_ms=oldest_live_ms,
+                                  progress=show, store=store)
+        # 4) enrich in place
+        _apply_timeframes(rawdata, out, by_step, pairs_by_step, candles, base_step, cache)
 
-    # 4) merge in original order (computed overrides reused when both exist)
-    def _fid(x: Dict[str, Any]) -> Tuple[str, str]:
-        return (x.get("thread_id", ""), x.get("pair_id", ""))
+    if len(groups) == 1:
+        _enrich(*next(iter(groups.items())))
+    else:
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(groups))) as pool:
+            for f in [pool.submit(_enrich, sym, idxs) for sym, idxs in groups.items()]:
+                f.result()
 
-    comp_idx = { _fid(x): x for x in computed }
-    out: List[Dict[str, Any]] = []
-    for s in rawdata:
-        key = _fid(s)
-        if key in comp_idx:
-            out.append(comp_idx[key])
-        else:
-            rr = next((r for r in reused_ready if _fid(r) == key), s)
-            out.append(rr)
-            if _is_enriched(rr):
-                cache.put(rr)
+    cache.schedule_snapshot()
+    return out
+
+# -------------------- async path (ccxt.async_support) --------------------
+_AEX_LOCK: asyncio.Lock | None = None
+_AEX_SINGLETON: ccxt_async.bybit | None = None
+_AIOHTTP_SESSION = None  # aiohttp.ClientSession shared by every async fetch
+
+async def init_bybit_public_async() -> ccxt_async.bybit:
+    """Async singleton on the running loop; one shared aiohttp session, markets loaded once."""
+    global _AEX_LOCK, _AEX_SINGLETON, _AIOHTTP_SESSION
+    if _AEX_LOCK is None:
+        _AEX_LOCK = asyncio.Lock()
+    async with _AEX_LOCK:
+        if _AEX_SINGLETON is None:
+            import aiohttp  # ccxt.async_support dependency
+            _AIOHTTP_SESSION = aiohttp.ClientSession()
+            ex = ccxt_async.bybit({"enableRateLimit": True, "session": _AIOHTTP_SESSION})
+            ex.options["defaultType"] = DEFAULT_TYPE
+            print("Loading markets (Bybit | public, async)…")
+            await ex.load_markets()
+            print("Loading markets done. ✅")
+            _AEX_SINGLETON = ex
+    _CACHE.load_snapshot_once()
+    return _AEX_SINGLETON
+
+async def close_bybit_public_async() -> None:
+    """Close the async client and its shared session (call before the loop stops)."""
+    global _AEX_SINGLETON, _AIOHTTP_SESSION, _AEX_LOCK
+    ex, sess = _AEX_SINGLETON, _AIOHTTP_SESSION
+    _AEX_SINGLETON = _AIOHTTP_SESSION = _AEX_LOCK = None
+    if ex is not None:
+        await ex.close()
+    if sess is not None:
+        await sess.close()
+
+async def _fetch_ohlcv_range_async(ex, symbol, timeframe, start_ms, end_ms, limit=1000) -> list[list]:
+    """Async twin of _fetch_ohlcv_range (no spinner; ccxt's async throttler paces requests)."""
+    _METRICS["fetch_calls"] += 1
+    out, since = [], start_ms
+    step = _step_ms(timeframe)
+    while since <= end_ms:
+        batch = await ex.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        if not batch:
+            break
+        for c in batch:
+            if c[0] > end_ms:
+                break
+            if c[0] >= start_ms:
+                out.append(c)  # [ts, o, h, l, c, v]
+        nxt = batch[-1][0] + step
+        if nxt <= since:
+            break
+        since = nxt
+        if len(batch) < limit:
+            break
+        await asyncio.sleep(0.01)
+    return out
+
+async def _fetch_ohlcv_shared_async(ex, symbol, timeframe, start_ms, end_ms, limit=1000) -> list[list]:
+    """_fetch_ohlcv_range_async behind the single-flight layer (shared with sync callers)."""
+    start_ms, end_ms = _aligned(timeframe, start_ms, end_ms)
+    own, waits = _FLIGHTS.claim(symbol, timeframe, start_ms, end_ms)
+    _METRICS["fetch_coalesced"] += bool(waits)
+
+    async def _own(s0, e0, fut):
+        try:
+            rows = await _fetch_ohlcv_range_async(ex, symbol, timeframe, s0, e0, limit)
+            fut.set_result(rows)
+            return rows
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            _FLIGHTS.release(symbol, timeframe, fut)
+
+    parts = await asyncio.gather(*(_own(*o) for o in own), *(asyncio.wrap_future(f) for f in waits))
+    return _join_rows(parts, start_ms, end_ms)
+
+async def _candles_for_range_async(ex, symbol, timeframe, start_ms, end_ms, *,
+                                   store: CandleStore | None = None) -> list[list]:
+    """Async twin of _candles_for_range; head and tail gaps are fetched concurrently."""
+    store = store or default_store()
+    gaps = _store_gaps(store, symbol, timeframe, start_ms, end_ms)
+    if not gaps:
+        _METRICS["store_hits"] += 1
+        return store.read_range(symbol, timeframe, start_ms, end_ms)
+
+    parts = await asyncio.gather(*(
+        _fetch_ohlcv_shared_async(ex, symbol, timeframe, g_start, g_end) for g_start, g_end in gaps
+    ))
+    fetched = [c for part in parts for c in part]
+    return _store_merge(store, symbol, timeframe, start_ms, end_ms, fetched)
+
+async def _window_candles_async(ex, symbol, timeframe, start_ms, end_ms, *, oldest_live_ms: int,
+                                store: CandleStore | None = None) -> list[list]:
+    """Async twin of _window_candles; window deltas are fetched concurrently."""
+    step = _step_ms(timeframe)
+    w = _window_for(symbol, timeframe)
+    gaps = w.missing(start_ms, end_ms)
+    if not gaps:
+        _METRICS["window_hits"] += 1
+    now_ms = int(time.time() * 1000)
+    parts = await asyncio.gather(*(
+        _candles_for_range_async(ex, symbol, timeframe, g_start, g_end, store=store) for g_start, g_end in gaps
+    ))
+    for (g_start, g_end), rows in zip(gaps, parts):
+        w.add(rows, g_start, g_end, now_ms=now_ms)
+    _METRICS["window_evicted"] += w.evict_before(_bucket_open(oldest_live_ms, step) - step)
+    return w.slice(start_ms, end_ms)
+
+async def process_async(rawdata: List[DivergenceEvent], *, ticker: Optional[str] = None,
+                        cache: PivotCache = _CACHE, store: CandleStore | None = None) -> List[DivergenceEvent]:
+    """
+    asyncio-native process(): same reuse/enrichment, candles via the async ccxt client.
+    Symbols are fetched concurrently (at most MAX_FETCH_WORKERS at once; ccxt's async
+    throttler keeps the shared client within Bybit's rate limit).
+    """
+    if not rawdata:
+        return []
+
+    out, groups, symbols = _plan_block(rawdata, cache, ticker)
+    if not groups:
+        return out
+
+    ex = await init_bybit_public_async()
+    sem = asyncio.Semaphore(MAX_FETCH_WORKERS)
+
+    async def _enrich(symbol: str, idxs: List[int]) -> None:
+        by_step, pairs_by_step = _split_by_step(rawdata, idxs)
+        base_tf = _base_tf_for(by_step)
+        base_step = _step_ms(base_tf)
+        start_ms, end_ms, oldest_live_ms = _fetch_bounds(rawdata, symbols, symbol, pairs_by_step, base_step)
+        async with sem:
+            candles = await _window_candles_async(ex, symbol, base_tf, start_ms, end_ms,
+                                                  oldest_live_ms=oldest_live_ms, store=store)
+        _apply_timeframes(rawdata, out, by_step, pairs_by_step, candles, base_step, cache)
 
+    await asyncio.gather(*(_enrich(sym, idxs) for sym, idxs in groups.items()))
+    cache.schedule_snapshot()
     return out
 
 # -------------------- standalone sample --------------------
@@ -431,13 +1026,13 @@ SEQ_3 = [
 
 def _print_preview(sample_seq_list, updated):
     for orig, new in zip(sample_seq_list, updated):
-        l1_old = orig["L1"]["price"]
-        l2_old = orig["L2"]["price"]
-        l1_new = new["L1"]["price"]
-        l2_new = new["L2"]["price"]
-        h1_p   = new["H1"]["price"]
-        h1_ts  = new["H1"]["time"] * 1000  # ms for logs
-        print(f"{new.get('status','')} {new.get('side','')} | "
+        l1_old = orig.l1_price
+        l2_old = orig.l2_price
+        l1_new = new.l1_price
+        l2_new = new.l2_price
+        h1_p   = new.h1_price
+        h1_ts  = new.h1_time * 1000  # ms for logs
+        print(f"{new.status} {new.side} | "
               f"L1 {l1_old} → {l1_new} | L2 {l2_old} → {l2_new} | "
               f"H1 {h1_p} @ {h1_ts}")
 
@@ -449,20 +1044,23 @@ if __name__ == "__main__":
     reset_cache_stats()
 
     print("\n=== Run A: SEQ_1 (compute expected) ===")
-    out1 = process(SEQ_1, ticker="BTC", progress=True)
-    _print_preview(SEQ_1, out1)
+    seq1 = events_from_dicts(SEQ_1)
+    out1 = process(seq1, ticker="BTC", progress=True)
+    _print_preview(seq1, out1)
     print("Stats after Run A:", cache_stats())
 
     print("\n=== Run B: SEQ_2 (reuse expected by thread_id/pair_id) ===")
-    out2 = process(SEQ_2, ticker="BTC", progress=False)
-    _print_preview(SEQ_2, out2)
+    seq2 = events_from_dicts(SEQ_2)
+    out2 = process(seq2, ticker="BTC", progress=False)
+    _print_preview(seq2, out2)
     print("Stats after Run B:", cache_stats())
 
     print("\n=== Run C: SEQ_3 (reuse expected again) ===")
-    out3 = process(SEQ_3, ticker="BTC", progress=False)
-    _print_preview(SEQ_3, out3)
+    seq3 = events_from_dicts(SEQ_3)
+    out3 = process(seq3, ticker="BTC", progress=False)
+    _print_preview(seq3, out3)
     print("Stats after Run C:", cache_stats())
 
     print("\nExpectations:")
-    print(f"- Run A: computed_items increases by {len(SEQ_1)}, fetch_calls = 1")
+    print(f"- Run A: computed_items increases by {len(SEQ_1)}, fetch_calls <= 1 (0 if data/candles already covers it)")
     print("- Run B & C: reused_items increases by ~len(batch) each, fetch_calls should not increase")
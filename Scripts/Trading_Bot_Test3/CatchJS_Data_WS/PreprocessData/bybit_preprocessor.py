@@ -1,25 +1,101 @@
 ﻿# Scripts/Trading_Bot_Test3/CatchJS_Data_WS/PreprocessData/bybit_preprocessor.py
-from typing import List, Dict, Any
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import List, Any, Optional
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import sequence_store
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_highs_lows_15m_batch as highs_lows
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import latency
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
 
-def process(data: Any, ticker: str = "BTC", stored_data: bool = False):
+def _store(processed_list: List[DivergenceEvent], stored_data: bool) -> None:
+    if stored_data:
+        for p in processed_list:
+            sequence_store.save_data_locally(p.to_dict())
+
+def process(data: Any, ticker: Optional[str] = None, stored_data: bool = False):
     """
-    If list[dict] -> compute Bybit 15m L1/L2 lows (−1h) + H1 highs and return list.
+    If list[DivergenceEvent] -> compute Bybit L1/L2 lows (−1h) + H1 highs and return list.
+                     Symbol per event (highs_lows.ticker_for) unless `ticker` forces one.
                      Persist each processed element exactly once.
     If dict -> pass through unchanged (no persistence).
     """
     if isinstance(data, list):
+        latency.mark("enrich_start", data)
         try:
-            processed_list: List[Dict[str, Any]] = highs_lows.process(data, ticker=ticker)
+            processed_list: List[DivergenceEvent] = highs_lows.process(data, ticker=ticker)
         except Exception as e:
             print(f"[bybit_preprocessor] ERROR fallback passthrough: {e}")
             processed_list = data  # fall back to raw if enrichment fails
+        latency.mark("enrich_end", processed_list)
+
+        _store(processed_list, stored_data)
+        return processed_list
+
+    return dict(data)
 
-        if stored_data:
-            for p in processed_list:
-                sequence_store.save_data_locally(p)
+async def process_async(data: Any, ticker: Optional[str] = None, stored_data: bool = False):
+    """Same contract as process(), enrichment via the async ccxt client."""
+    if isinstance(data, list):
+        latency.mark("enrich_start", data)
+        try:
+            processed_list: List[DivergenceEvent] = await highs_lows.process_async(data, ticker=ticker)
+        except Exception as e:
+            print(f"[bybit_preprocessor] ERROR fallback passthrough: {e}")
+            processed_list = data
+        latency.mark("enrich_end", processed_list)
 
+        _store(processed_list, stored_data)
         return processed_list
 
     return dict(data)
+
+# === Background enrichment loop (keeps the sync Playwright thread free) =====
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_ready = threading.Event()
+
+def start_worker():
+    """Start the enrichment event loop in a background thread (idempotent)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+
+    def _thread_target():
+        global _loop
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        _ready.set()
+        try:
+            _loop.run_forever()
+        finally:
+            _loop.run_until_complete(highs_lows.close_bybit_public_async())
+            _loop.run_until_complete(_loop.shutdown_asyncgens())
+            _loop.close()
+
+    _ready.clear()
+    _thread = threading.Thread(target=_thread_target, name="bybit-enrich", daemon=True)
+    _thread.start()
+    _ready.wait()
+
+def warm():
+    """Start the worker and load Bybit markets on it (blocks until done)."""
+    start_worker()
+    assert _loop is not None
+    asyncio.run_coroutine_threadsafe(highs_lows.init_bybit_public_async(), _loop).result()
+
+def submit(data: Any, ticker: Optional[str] = None, stored_data: bool = False) -> Future:
+    """Schedule process_async() on the background loop; returns a concurrent Future."""
+    start_worker()
+    assert _loop is not None
+    return asyncio.run_coroutine_threadsafe(process_async(data, ticker=ticker, stored_data=stored_data), _loop)
+
+def stop_worker():
+    """Stop the background loop and close the async Bybit client."""
+    global _thread
+    if not _thread:
+        return
+    if _loop and _loop.is_running():
+        _loop.call_soon_threadsafe(_loop.stop)
+    _thread.join(timeout=3)
+    _thread = None
@@ -0,0 +1,177 @@
+# candle_series.py
+# Columnar candle container with O(log n) bucket lookup and O(1) range-max of highs.
+# Built once per fetched window; process() resolves every pivot of a block against it.
+# CandleWindow keeps the per-symbol rolling candles so each new block only fetches its delta.
+# resample() derives higher timeframes from one cached lower-resolution series.
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+
+class CandleSeries:
+    """
+    Candles as parallel columns (ts/open/high/low/close/volume), sorted by open time.
+      - low_at(ts)            -> low of the bar containing ts            (bisect)
+      - max_high(start, end)  -> (high, bar_open_ms) over start..end     (sparse table)
+    Ties on the high resolve to the earliest bar, like max() over the row list did.
+    """
+    __slots__ = ("step_ms", "ts", "open", "high", "low", "close", "volume", "_sparse")
+
+    def __init__(self, candles: List[list], step_ms: int):
+        rows = sorted(candles, key=lambda c: c[0])
+        self.step_ms = int(step_ms)
+        self.ts = array("q", (int(c[0]) for c in rows))
+        self.open = array("d", (float(c[1]) for c in rows))
+        self.high = array("d", (float(c[2]) for c in rows))
+        self.low = array("d", (float(c[3]) for c in rows))
+        self.close = array("d", (float(c[4]) for c in rows))
+        self.volume = array("d", (float(c[5] or 0.0) for c in rows))
+        self._sparse = self._build_sparse()
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def _build_sparse(self) -> List[array]:
+        """_sparse[k][i] = index of the highest bar in [i, i + 2**k)."""
+        n = len(self.high)
+        hi = self.high
+        levels = [array("l", range(n))]
+        k = 1
+        while (1 << k) <= n:
+            prev = levels[-1]
+            half = 1 << (k - 1)
+            cur = array("l")
+            for i in range(n - (1 << k) + 1):
+                a, b = prev[i], prev[i + half]
+                cur.append(a if hi[a] >= hi[b] else b)
+            levels.append(cur)
+            k += 1
+        return levels
+
+    # ---------- lookups ----------
+    def index_at(self, ts_ms: int) -> int:
+        """Index of the bar whose [open, open + step) contains ts_ms, or -1."""
+        i = bisect_right(self.ts, ts_ms) - 1
+        if i >= 0 and ts_ms < self.ts[i] + self.step_ms:
+            return i
+        return -1
+
+    def low_at(self, ts_ms: int) -> float:
+        i = self.index_at(ts_ms)
+        if i < 0:
+            raise RuntimeError(f"{self.step_ms // 60_000}m candle not found for ts={ts_ms}")
+        return self.low[i]
+
+    def max_high(self, start_ms: int, end_ms: int) -> Tuple[float, int]:
+        """Highest high among bars with start_ms <= open <= end_ms."""
+        lo = bisect_left(self.ts, start_ms)
+        hi = bisect_right(self.ts, end_ms) - 1
+        if lo > hi:
+            raise RuntimeError("No candles in L1→L2 window")
+        k = (hi - lo + 1).bit_length() - 1
+        a = self._sparse[k][lo]
+        b = self._sparse[k][hi - (1 << k) + 1]
+        best = a if self.high[a] >= self.high[b] else b
+        return self.high[best], self.ts[best]
+
+    def resolve_pivots(self, pairs: List[Tuple[int, int]]) -> List[Tuple[float, float, float, int]]:
+        """
+        One pass over a whole block: for each (l1_ts, l2_ts) return
+        (l1_low, l2_low, h1_high, h1_open_ms) with H1 taken over the L1→L2 window.
+        """
+        out: List[Tuple[float, float, float, int]] = []
+        for l1_ts, l2_ts in pairs:
+            t_start, t_end = (l1_ts, l2_ts) if l1_ts <= l2_ts else (l2_ts, l1_ts)
+            h1_price, h1_ts = self.max_high(t_start, t_end)
+            out.append((self.low_at(l1_ts), self.low_at(l2_ts), h1_price, h1_ts))
+        return out
+
+
+class CandleWindow:
+    """
+    Rolling in-memory candles for one (symbol, timeframe) that remembers its covered interval.
+      - missing(start, end)  -> contiguous head/tail gaps still to fetch
+      - add(rows, ...)       -> merge fetched rows and extend coverage (open bar stays uncovered)
+      - evict_before(ts)     -> drop bars older than the oldest live pivot
+    """
+
+    def __init__(self, step_ms: int):
+        self.step_ms = int(step_ms)
+        self.lo: int | None = None     # first covered bar open (ms)
+        self.hi: int | None = None     # last covered *closed* bar open (ms)
+        self._rows: dict[int, list] = {}
+        self._keys: List[int] | None = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def missing(self, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        step = self.step_ms
+        start_ms = (start_ms // step) * step
+        if self.lo is None or self.hi is None:
+            return [(start_ms, end_ms)]
+        gaps: List[Tuple[int, int]] = []
+        if start_ms < self.lo:
+            gaps.append((start_ms, self.lo - step))
+        if end_ms > self.hi:
+            gaps.append((self.hi + step, end_ms))
+        return gaps
+
+    def add(self, rows: List[list], start_ms: int, end_ms: int, *, now_ms: int) -> None:
+        """Merge rows fetched for [start_ms, end_ms]; coverage stops at the last closed bar."""
+        step = self.step_ms
+        for r in rows:
+            self._rows[int(r[0])] = r
+        self._keys = None
+
+        last_closed = (now_ms // step) * step - step
+        covered_to = min(end_ms, last_closed)
+        if covered_to < start_ms:
+            return  # only the open bar (or nothing) — keep it, but don't mark covered
+        self.lo = start_ms if self.lo is None else min(self.lo, start_ms)
+        self.hi = covered_to if self.hi is None else max(self.hi, covered_to)
+
+    def evict_before(self, ts_ms: int) -> int:
+        """Drop bars opening before ts_ms. Returns how many were evicted."""
+        if self.lo is None or ts_ms <= self.lo:
+            return 0
+        old = [k for k in self._rows if k < ts_ms]
+        for k in old:
+            del self._rows[k]
+        self._keys = None
+        self.lo = (ts_ms // self.step_ms) * self.step_ms
+        if self.hi is not None and self.hi < self.lo:
+            self.lo = self.hi = None
+        return len(old)
+
+    def slice(self, start_ms: int, end_ms: int) -> List[list]:
+        if self._keys is None:
+            self._keys = sorted(self._rows)
+        keys = self._keys
+        i, j = bisect_left(keys, start_ms), bisect_right(keys, end_ms)
+        return [self._rows[k] for k in keys[i:j]]
+
+
+def resample(candles: List[list], step_ms: int) -> List[list]:
+    """
+    Aggregate sorted lower-timeframe rows into `step_ms` buckets (UTC-aligned):
+    open=first, high=max, low=min, close=last, volume=sum.
+    """
+    out: List[list] = []
+    cur: list | None = None
+    for ts, o, h, l, c, v in candles:
+        bo = (int(ts) // step_ms) * step_ms
+        if cur is None or cur[0] != bo:
+            cur = [bo, o, h, l, c, v or 0.0]
+            out.append(cur)
+        else:
+            if h > cur[2]:
+                cur[2] = h
+            if l < cur[3]:
+                cur[3] = l
+            cur[4] = c
+            cur[5] += v or 0.0
+    return out
@@ -0,0 +1,160 @@
+# candle_store.py
+# Append-only on-disk OHLCV store keyed by (symbol, timeframe).
+# One fixed-width binary file per key under data/candles/, records sorted by open time,
+# read through mmap + binary search so range lookups never load the whole file.
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import struct
+import time
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional, Tuple
+
+# -------------------- config --------------------
+_REC = struct.Struct("<q5d")   # ts_ms, open, high, low, close, volume
+REC_SIZE = _REC.size           # 48 bytes per candle
+
+# this file is at .../Scripts/Trading_Bot_Test3/CatchJS_Data_WS/PreprocessData/candle_store.py
+DEFAULT_DIR = Path(__file__).resolve().parents[2] / "data" / "candles"
+
+
+def _file_key(symbol: str, timeframe: str) -> str:
+    """'BTC/USDT:USDT', '15m' -> 'BTC_USDT_USDT_15m' (filesystem-safe)."""
+    return re.sub(r"[^A-Za-z0-9]+", "_", symbol).strip("_") + f"_{timeframe}"
+
+
+class CandleStore:
+    """
+    Contiguous, append-only candle files.
+      - merge() appends newer closed candles; an earlier head is spliced in with an atomic rewrite.
+        With max_gap_ms, candles too far past the tail start the file over (never a hole in it).
+      - bounds() / read_range() answer from the file alone (no network).
+    The still-open bar is never persisted, so a stored candle is final.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root is not None else DEFAULT_DIR
+        self._lock = Lock()
+
+    def path_for(self, symbol: str, timeframe: str) -> Path:
+        return self.root / f"{_file_key(symbol, timeframe)}.bin"
+
+    # ---------- reads ----------
+    def _count(self, path: Path) -> int:
+        try:
+            return path.stat().st_size // REC_SIZE
+        except FileNotFoundError:
+            return 0
+
+    def bounds(self, symbol: str, timeframe: str) -> Optional[Tuple[int, int]]:
+        """(first_open_ms, last_open_ms) of the stored series, or None if empty."""
+        path = self.path_for(symbol, timeframe)
+        n = self._count(path)
+        if n == 0:
+            return None
+        with open(path, "rb") as f:
+            first = _REC.unpack(f.read(REC_SIZE))[0]
+            f.seek((n - 1) * REC_SIZE)
+            last = _REC.unpack(f.read(REC_SIZE))[0]
+        return int(first), int(last)
+
+    def read_range(self, symbol: str, timeframe: str, start_ms: int, end_ms: int) -> List[list]:
+        """Stored candles with start_ms <= ts <= end_ms as [ts, o, h, l, c, v] rows."""
+        path = self.path_for(symbol, timeframe)
+        n = self._count(path)
+        if n == 0 or end_ms < start_ms:
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), n * REC_SIZE, access=mmap.ACCESS_READ) as mm:
+            def ts_at(i: int) -> int:
+                return struct.unpack_from("<q", mm, i * REC_SIZE)[0]
+
+            lo, hi = 0, n
+            while lo < hi:  # first index with ts >= start_ms
+                mid = (lo + hi) // 2
+                if ts_at(mid) < start_ms:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            out: List[list] = []
+            for rec in _REC.iter_unpack(mm[lo * REC_SIZE:n * REC_SIZE]):
+                if rec[0] > end_ms:
+                    break
+                out.append([int(rec[0]), *rec[1:]])
+        return out
+
+    def read_all(self, symbol: str, timeframe: str) -> List[list]:
+        b = self.bounds(symbol, timeframe)
+        return self.read_range(symbol, timeframe, b[0], b[1]) if b else []
+
+    # ---------- writes ----------
+    def merge(self, symbol: str, timeframe: str, candles: List[list], step_ms: int,
+              *, now_ms: Optional[int] = None, max_gap_ms: Optional[int] = None) -> int:
+        """
+        Persist closed candles that extend the stored series. Returns how many were written.
+        Candles must be contiguous with the stored range (callers fetch exact head/tail gaps).
+        max_gap_ms: a tail starting more than that after the stored one replaces the file;
+        a head ending that far before the stored one is not kept.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        closed = sorted((c for c in candles if int(c[0]) + step_ms <= now_ms), key=lambda c: c[0])
+        if not closed:
+            return 0
+
+        with self._lock:
+            path = self.path_for(symbol, timeframe)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            b = self.bounds(symbol, timeframe)
+
+            if b is None:
+                self._rewrite(path, closed)
+                return len(closed)
+
+            first, last = b
+            head = [c for c in closed if int(c[0]) < first]
+            tail = [c for c in closed if int(c[0]) > last]
+            if max_gap_ms is not None:
+                if tail and int(tail[0][0]) - last > max_gap_ms:
+                    self._rewrite(path, tail)  # back-filling the gap would cost more than the file is worth
+                    return len(tail)
+                if head and first - int(head[-1][0]) > max_gap_ms:
+                    head = []
+
+            if head:
+                # splice the earlier head in front; rare, so a full atomic rewrite is fine
+                body = self.read_range(symbol, timeframe, first, last)
+                self._rewrite(path, head + body + tail)
+            elif tail:
+                self._truncate_partial(path)
+                with open(path, "ab") as f:
+                    f.write(b"".join(self._pack(c) for c in tail))
+            return len(head) + len(tail)
+
+    @staticmethod
+    def _pack(c: list) -> bytes:
+        return _REC.pack(int(c[0]), float(c[1]), float(c[2]), float(c[3]), float(c[4]), float(c[5] or 0.0))
+
+    def _rewrite(self, path: Path, candles: List[list]) -> None:
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(self._pack(c) for c in candles))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _truncate_partial(path: Path) -> None:
+        """Drop a torn trailing record left by an interrupted append."""
+        size = path.stat().st_size
+        if size % REC_SIZE:
+            with open(path, "r+b") as f:
+                f.truncate(size - size % REC_SIZE)
+
+
+_STORE = CandleStore()
+
+def default_store() -> CandleStore:
+    return _STORE
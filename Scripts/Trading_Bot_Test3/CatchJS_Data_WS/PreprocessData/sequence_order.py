@@ -1,20 +1,20 @@
 # Scripts/Trading_Bot_Test3/CatchJS_Data_WS/PreprocessData/sequence_order.py
-from typing import List, Dict, Any
+from typing import List
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
 
-def _l1_time(ev: Dict[str, Any]) -> int:
+def _l1_time(ev: DivergenceEvent) -> int:
     """
-    Extract L1.time (seconds) from event. Falls back to pivots.L1.time.
+    L1 time (seconds) of an event.
     Returns a large value if missing so bad items sort last.
     """
     try:
-        l1 = ev.get("L1") or ev.get("pivots", {}).get("L1", {})
-        return int(l1.get("time"))  # seconds
+        return int(ev.l1_time)  # seconds
     except Exception:
         return 10**15  # push malformed to end
 
-def order_by_l1_time(block: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def order_by_l1_time(block: List[DivergenceEvent]) -> List[DivergenceEvent]:
     """
-    Sort a sequence block (list[dict]) by L1.time ascending.
+    Sort a sequence block (list[DivergenceEvent]) by L1 time ascending.
     Stable sort: preserves original order for ties/missing.
     """
     if not isinstance(block, list):
@@ -0,0 +1,125 @@
+# fake_exchange.py
+# Deterministic, offline stand-in for ccxt.bybit (plug in via bybit_highs_lows_15m_batch.use_exchange).
+# Serves OHLCV from recorded CandleStore files (data/candles) and falls back to a seeded
+# synthetic series; latency and rate limits are configurable so runs are reproducible.
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData.candle_store import CandleStore
+
+_TF_MS: Dict[str, int] = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "12h": 43_200_000, "1d": 86_400_000,
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when on_limit='raise' and a call exceeds the configured rate."""
+
+
+class FakeExchange:
+    """
+    ccxt-shaped sync backend.
+      recorded_dir     : CandleStore root with recorded candles (None = synthetic only)
+      latency_ms       : fixed delay per fetch_ohlcv call
+      rate_limit_per_s : max calls per second (None = unlimited)
+      on_limit         : 'sleep' (throttle like ccxt) or 'raise' (RateLimitExceeded)
+      synthetic        : serve a seeded random walk where nothing is recorded
+    """
+    id = "fake-bybit"
+
+    def __init__(self, recorded_dir: Optional[Path] = None, *, latency_ms: float = 0.0,
+                 rate_limit_per_s: Optional[float] = None, on_limit: str = "sleep",
+                 synthetic: bool = True, base_price: float = 100_000.0, seed: int = 7):
+        self.store = CandleStore(Path(recorded_dir)) if recorded_dir is not None else None
+        self.latency_ms = float(latency_ms)
+        self.rate_limit_per_s = rate_limit_per_s
+        self.rateLimit = 1000.0 / rate_limit_per_s if rate_limit_per_s else 0  # ccxt attribute (ms)
+        self.on_limit = on_limit
+        self.synthetic = synthetic
+        self.base_price = float(base_price)
+        self.seed = int(seed)
+        self.options: Dict[str, str] = {}
+        self.calls = 0
+        self.rows_served = 0
+        self._lock = Lock()
+        self._next_slot = 0.0
+
+    # ---------- ccxt surface ----------
+    def load_markets(self, *_args, **_kwargs) -> dict:
+        return {}
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = "15m", since: Optional[int] = None,
+                    limit: int = 1000, params: Optional[dict] = None) -> List[list]:
+        wait = self._pace()
+        if wait:
+            time.sleep(wait)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return self._serve(symbol, timeframe, since, limit)
+
+    # ---------- internals ----------
+    def _pace(self) -> float:
+        """Reserve a call slot; returns seconds the caller must wait (0 when unlimited)."""
+        with self._lock:
+            self.calls += 1
+            if not self.rate_limit_per_s:
+                return 0.0
+            now = time.monotonic()
+            wait = max(0.0, self._next_slot - now)
+            if wait and self.on_limit == "raise":
+                raise RateLimitExceeded(f"{self.id}: more than {self.rate_limit_per_s}/s")
+            self._next_slot = max(now, self._next_slot) + 1.0 / self.rate_limit_per_s
+        return wait
+
+    def _serve(self, symbol: str, timeframe: str, since: Optional[int], limit: int) -> List[list]:
+        step = _TF_MS[timeframe]
+        since = 0 if since is None else (int(since) + step - 1) // step * step  # first bar at/after since
+        end = since + (limit - 1) * step
+        now_open = int(time.time() * 1000) // step * step
+        end = min(end, now_open)  # no future bars, like the real venue
+
+        rows: List[list] = []
+        if self.store is not None:
+            rows = self.store.read_range(symbol, timeframe, since, end)[:limit]
+        if not rows and self.synthetic and since <= end:
+            rows = [self._bar(symbol, step, t) for t in range(since, end + 1, step)]
+        self.rows_served += len(rows)
+        return rows
+
+    def _bar(self, symbol: str, step: int, ts: int) -> list:
+        """Seeded bar: same (symbol, timeframe, ts) always yields the same OHLCV."""
+        rng = random.Random(f"{self.seed}|{symbol}|{step}|{ts}")
+        drift = ((ts // step) % 997) / 997.0 - 0.5  # slow, bounded wander
+        o = self.base_price * (1.0 + 0.05 * drift)
+        c = o * (1.0 + rng.uniform(-0.003, 0.003))
+        h = max(o, c) * (1.0 + rng.uniform(0.0, 0.002))
+        l = min(o, c) * (1.0 - rng.uniform(0.0, 0.002))
+        return [ts, round(o, 1), round(h, 1), round(l, 1), round(c, 1), round(rng.uniform(1, 50), 3)]
+
+
+class AsyncFakeExchange(FakeExchange):
+    """ccxt.async_support-shaped twin (awaitable fetch_ohlcv / load_markets / close)."""
+
+    async def load_markets(self, *_args, **_kwargs) -> dict:
+        return {}
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = "15m", since: Optional[int] = None,
+                          limit: int = 1000, params: Optional[dict] = None) -> List[list]:
+        wait = self._pace()
+        if wait:
+            await asyncio.sleep(wait)
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        return self._serve(symbol, timeframe, since, limit)
+
+    async def close(self) -> None:
+        return None
@@ -0,0 +1,152 @@
+# replay_runner.py
+# Offline replay of recorded blocks (data/sequences_*/seq_N.json) through the producer path
+# order → enrich → emit, against FakeExchange instead of live Bybit; prints per-stage latency.
+#
+#   python -m Scripts.Trading_Bot_Test3.CatchJS_Data_WS.Replay.replay_runner --latency-ms 40 --rate 50
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_highs_lows_15m_batch as highs_lows
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import sequence_order
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData.candle_store import CandleStore
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.Replay.fake_exchange import FakeExchange, AsyncFakeExchange
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent, events_from_dicts, to_wire
+
+# this file is at .../Scripts/Trading_Bot_Test3/CatchJS_Data_WS/Replay/replay_runner.py
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+STAGES = ("order", "enrich", "emit", "total")
+
+
+def load_blocks(dirs: Optional[List[Path]] = None) -> List[List[DivergenceEvent]]:
+    """Recorded blocks from every sequences_* dir (or `dirs`), in sequence-number order."""
+    dirs = dirs or sorted(DATA_DIR.glob("sequences_*"))
+    blocks: List[List[DivergenceEvent]] = []
+    for d in dirs:
+        files = sorted(Path(d).glob("seq_*.json"), key=lambda p: int(re.sub(r"\D", "", p.stem) or 0))
+        for f in files:
+            block = json.loads(f.read_text(encoding="utf-8"))
+            if isinstance(block, list) and block:
+                blocks.append(events_from_dicts(block))
+    return blocks
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (values need not be sorted)."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = max(0, min(len(xs) - 1, math.ceil(pct / 100.0 * len(xs)) - 1))
+    return xs[k]
+
+
+def summarize(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for stage, xs in timings.items():
+        out[stage] = {
+            "n": len(xs),
+            "mean_ms": round(sum(xs) / len(xs), 3) if xs else 0.0,
+            "p50_ms": round(percentile(xs, 50), 3),
+            "p99_ms": round(percentile(xs, 99), 3),
+            "max_ms": round(max(xs), 3) if xs else 0.0,
+        }
+    return out
+
+
+def _json_emit(block) -> None:
+    """Default emit stage: the hub's per-block serialization cost, no sockets."""
+    json.dumps(to_wire(block))
+
+
+def replay(blocks: List[List[DivergenceEvent]], *, latency_ms: float = 0.0, rate_limit_per_s: Optional[float] = None,
+           recorded_dir: Optional[Path] = None, use_async: bool = False, loops: int = 1,
+           emit: Callable[[list], None] = _json_emit,
+           cache: Optional[highs_lows.PivotCache] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run blocks through order → enrich → emit with a PivotCache (fresh unless `cache` is given) and a
+    scratch CandleStore (reuse across sequences behaves like a live session). Returns per-stage latency stats.
+    """
+    if use_async:
+        highs_lows.use_exchange(None, async_ex=AsyncFakeExchange(
+            recorded_dir, latency_ms=latency_ms, rate_limit_per_s=rate_limit_per_s))
+    else:
+        highs_lows.use_exchange(FakeExchange(recorded_dir, latency_ms=latency_ms, rate_limit_per_s=rate_limit_per_s))
+    highs_lows.reset_cache_stats()
+
+    cache = highs_lows.PivotCache() if cache is None else cache
+    timings: Dict[str, List[float]] = {s: [] for s in STAGES}
+    loop = asyncio.new_event_loop() if use_async else None
+
+    with tempfile.TemporaryDirectory() as scratch:
+        store = CandleStore(Path(scratch))
+        try:
+            for _ in range(loops):
+                for block in blocks:
+                    t0 = time.perf_counter()
+                    ordered = sequence_order.order_by_l1_time(block)
+                    t1 = time.perf_counter()
+                    if loop is not None:
+                        processed = loop.run_until_complete(
+                            highs_lows.process_async(ordered, cache=cache, store=store))
+                    else:
+                        processed = highs_lows.process(ordered, cache=cache, store=store)
+                    t2 = time.perf_counter()
+                    emit(processed)
+                    t3 = time.perf_counter()
+
+                    timings["order"].append((t1 - t0) * 1000)
+                    timings["enrich"].append((t2 - t1) * 1000)
+                    timings["emit"].append((t3 - t2) * 1000)
+                    timings["total"].append((t3 - t0) * 1000)
+        finally:
+            if loop is not None:
+                loop.close()
+            highs_lows.use_exchange(None)
+    return summarize(timings)
+
+
+def _print_report(stats: Dict[str, Dict[str, float]], blocks: int, cache: highs_lows.PivotCache) -> None:
+    print(f"\n=== Replay: {blocks} blocks ===")
+    print(f"{'stage':<8}{'n':>6}{'mean':>10}{'p50':>10}{'p99':>10}{'max':>10}   (ms)")
+    for stage in STAGES:
+        s = stats[stage]
+        print(f"{stage:<8}{s['n']:>6}{s['mean_ms']:>10.3f}{s['p50_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}")
+    print("Enrichment stats:", highs_lows.cache_stats(cache))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Replay recorded sequences through order → enrich → emit offline.")
+    ap.add_argument("--dir", action="append", type=Path, help="sequences_* dir (repeatable; default: all)")
+    ap.add_argument("--recorded", type=Path, default=None, help="CandleStore dir with recorded candles")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="fake exchange latency per call")
+    ap.add_argument("--rate", type=float, default=None, help="fake exchange calls per second")
+    ap.add_argument("--loops", type=int, default=1, help="replay the recording N times")
+    ap.add_argument("--async", dest="use_async", action="store_true", help="use process_async()")
+    ap.add_argument("--ws", action="store_true", help="emit through ws_emit_bridge instead of json.dumps")
+    args = ap.parse_args()
+
+    emit_fn: Callable[[list], None] = _json_emit
+    if args.ws:
+        from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
+        ws_emit_bridge.start_server("127.0.0.1", 8765)
+        emit_fn = ws_emit_bridge.send
+
+    recorded = load_blocks(args.dir)
+    pivots = highs_lows.PivotCache()
+    try:
+        result = replay(recorded, latency_ms=args.latency_ms, rate_limit_per_s=args.rate, recorded_dir=args.recorded,
+                        use_async=args.use_async, loops=args.loops, emit=emit_fn, cache=pivots)
+        _print_report(result, len(recorded) * args.loops, pivots)
+    finally:
+        if args.ws:
+            ws_emit_bridge.stop()
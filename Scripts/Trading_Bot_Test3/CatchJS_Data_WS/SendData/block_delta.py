@@ -0,0 +1,163 @@
+# block_delta.py
+# Consecutive aggr sequences mostly repeat the same threads with the same pivots; only `sequence`
+# moves. The hub diffs each block against the previous one per symbol, by thread_id, and sends
+# just the added / changed / removed threads plus the new sequence (BlockDiff). Receivers keep
+# the last full block per symbol and rebuild every delta into the block it stands for (BlockState).
+# Every delta part names its base: the hub message id of the frame it was diffed against. A client
+# only gets a delta when it already holds that base; otherwise the hub sends the full frame.
+# Parts come symbol by symbol; a block whose symbols interleave also carries its (symbol, thread_id)
+# order, so the rebuilt block matches the original one record for record.
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.state_snapshot import NO_SYMBOL, as_event, symbol_of
+
+
+def _body(ev: DivergenceEvent) -> tuple:
+    """Everything but thread_id (the key) and sequence (carried once per delta)."""
+    return (ev.side, ev.status, ev.tf_sec, ev.pair_id, ev.l1_time, ev.l1_price, ev.l2_time, ev.l2_price,
+            ev.h1_time, ev.h1_price, ev.cvd_l1, ev.cvd_l2, ev.v, ev.source, ev.extra)
+
+
+def wire_symbol(d: Dict[str, Any]) -> str:
+    """symbol_of() for a wire dict (extras are flattened into it)."""
+    raw = d.get("ticker") or d.get("symbol") or d.get("market")
+    return raw.strip() if isinstance(raw, str) and raw.strip() else NO_SYMBOL
+
+
+class Delta(NamedTuple):
+    symbols: Tuple[str, ...]                     # symbols whose thread state the payload sets
+    bases: Dict[str, Optional[int]]              # symbol → id of the frame the payload builds on (None → none)
+    parts: Optional[List[Dict[str, Any]]]        # per-symbol diff; None → the payload goes out in full
+    order: Optional[List[Tuple[str, str]]] = None  # block order as (symbol, thread_id); None → parts in turn
+
+
+# -------------------- hub side --------------------
+class BlockDiff:
+    def __init__(self):
+        self._threads: Dict[str, Dict[str, tuple]] = {}   # symbol → thread_id → _body()
+        self._ids: Dict[str, int] = {}                    # symbol → id of the frame that set it
+
+    def update(self, item: Any, msg_id: int, seq: Optional[int]) -> Delta:
+        """Fold one hub payload (sent as message `msg_id`) in and diff it against the previous one."""
+        if not isinstance(item, list):  # a lone event upserts its thread; it is its own delta
+            ev = as_event(item)
+            if ev is None:
+                return Delta((), {}, None)
+            sym = symbol_of(ev)
+            base = self._ids.get(sym)
+            self._threads.setdefault(sym, {})[ev.thread_id] = _body(ev)
+            self._ids[sym] = msg_id
+            return Delta((sym,), {sym: base}, None)
+
+        events = [as_event(o) for o in item]
+        groups: Dict[str, Dict[str, DivergenceEvent]] = {}
+        for ev in events:
+            if ev is not None:
+                groups.setdefault(symbol_of(ev), {})[ev.thread_id] = ev
+        # non-records or repeated thread_ids don't survive a diff: send those blocks as they are
+        whole = len(events) != sum(len(t) for t in groups.values())
+
+        parts: List[Dict[str, Any]] = []
+        bases: Dict[str, Optional[int]] = {}
+        unchanged = 0
+        for sym, threads in groups.items():
+            prev = self._threads.get(sym) or {}
+            bases[sym] = self._ids.get(sym)
+            new: Dict[str, tuple] = {}
+            added: List[DivergenceEvent] = []
+            changed: List[DivergenceEvent] = []
+            for tid, ev in threads.items():
+                body = new[tid] = _body(ev)
+                old = prev.get(tid)
+                if old is None:
+                    added.append(ev)
+                elif old != body or ev.sequence != seq:
+                    changed.append(ev)
+                else:
+                    unchanged += 1
+            part = {"symbol": sym, "base": bases[sym], "added": added, "changed": changed,
+                    "removed": [tid for tid in prev if tid not in threads]}
+            # receivers keep the previous order and append new threads; say so when the block differs
+            if [tid for tid in prev if tid in threads] + [ev.thread_id for ev in added] != list(threads):
+                part["order"] = list(threads)
+            parts.append(part)
+            self._threads[sym] = new
+            self._ids[sym] = msg_id
+
+        if whole or not unchanged:  # nothing to save: the full block is no bigger
+            return Delta(tuple(groups), bases, None)
+        order = [(symbol_of(ev), ev.thread_id) for ev in events]
+        if order == [(sym, tid) for sym, threads in groups.items() for tid in threads]:
+            order = None  # already grouped by symbol: concatenating the parts gives the block back
+        return Delta(tuple(groups), bases, parts, order)
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def clear(self) -> None:
+        self._threads.clear()
+        self._ids.clear()
+
+
+# -------------------- receiver side --------------------
+class BlockState:
+    def __init__(self):
+        self._threads: Dict[str, Dict[str, Dict[str, Any]]] = {}   # symbol → thread_id → wire dict
+        self._ids: Dict[str, int] = {}                             # symbol → id of the frame it reflects
+
+    def load(self, msg_id: int, data: Any) -> None:
+        """A full payload (frame or replayed frame): same folding as BlockDiff.update."""
+        if isinstance(data, dict):
+            sym = wire_symbol(data)
+            if isinstance(data.get("thread_id"), str) and sym in self._threads:  # unknown symbol: no base to extend
+                self._threads[sym][data["thread_id"]] = data
+                self._ids[sym] = msg_id
+            return
+        if not isinstance(data, list):
+            return
+        groups: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for d in data:
+            if isinstance(d, dict) and isinstance(d.get("thread_id"), str):
+                groups.setdefault(wire_symbol(d), {})[d["thread_id"]] = d
+        for sym, threads in groups.items():
+            self._threads[sym] = threads
+            self._ids[sym] = msg_id
+
+    def apply(self, msg: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """The full block a delta message stands for; None → this receiver doesn't hold a base it names."""
+        msg_id, seq = msg.get("id"), msg.get("seq")
+        parts = msg.get("parts") or ()
+        for p in parts:
+            base = p.get("base")
+            if base is not None and self._ids.get(p.get("symbol"), -1) < base:
+                return None
+        out: List[Dict[str, Any]] = []
+        rebuilt: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for p in parts:
+            sym = p.get("symbol")
+            prev = self._threads.get(sym, {}) if p.get("base") is not None else {}
+            removed = set(p.get("removed") or ())
+            threads = {tid: {**d, "sequence": seq} for tid, d in prev.items() if tid not in removed}
+            for d in (p.get("changed") or []) + (p.get("added") or []):
+                threads[d["thread_id"]] = d
+            order = p.get("order")
+            if order:
+                threads = {tid: threads[tid] for tid in order if tid in threads}
+            self._threads[sym] = rebuilt[sym] = threads
+            self._ids[sym] = msg_id
+            out.extend(threads.values())
+        order = msg.get("order")
+        if order:  # symbols interleave in this block
+            out = [rebuilt[sym][tid] for sym, tid in order if tid in rebuilt.get(sym, ())]
+        return out
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def clear(self) -> None:
+        self._threads.clear()
+        self._ids.clear()
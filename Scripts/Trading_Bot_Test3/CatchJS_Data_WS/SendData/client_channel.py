@@ -0,0 +1,181 @@
+# client_channel.py
+# One outbound lane per connected receiver: a bounded frame queue plus its own writer task,
+# so the hub's broadcast worker never awaits a socket. Each channel applies a slow-consumer
+# policy when its queue backs up and keeps counters the hub exposes through stats(), including
+# delivery confirmed by the receiver's cumulative ACKs. A channel also tracks which block each
+# symbol's thread state it last wrote, so a delta frame whose base this client never got (dropped,
+# or sent before it connected) goes out in full instead.
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import suppress
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+DROP_OLDEST = "drop_oldest"   # full queue → discard the oldest frame
+COALESCE = "coalesce"         # a newer sequence replaces every queued older live frame
+DISCONNECT = "disconnect"     # lag beyond max_lag → close the connection
+POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+CLOSE_TOO_SLOW = 4008         # app-range close code sent by the disconnect policy
+
+
+class Frame(NamedTuple):
+    id: Optional[int]         # hub message id (monotonic); catch-up frames: the latest id they reflect
+    wires: Dict[str, Any]     # codec name → encoded message, each shared by every channel using it
+    seq: Optional[int]        # aggr sequence the frame belongs to (None if unknown)
+    events: Any               # records carried, for latency marks once written
+    symbols: Tuple[str, ...] = ()                   # symbols whose thread state it sets once written
+    bases: Optional[Dict[str, Optional[int]]] = None  # symbol → frame id the client must hold first
+    full: Optional[Callable[[str], Any]] = None     # delta frame: codec name → the full encoding
+    catch_up: bool = False    # replay / snapshot / hello: state no live frame repeats, never coalesced
+
+
+class ClientChannel:
+    def __init__(
+        self,
+        cid: str,
+        ws,
+        *,
+        codec: str = "json",
+        policy: str = DROP_OLDEST,
+        maxsize: int = 64,
+        max_lag: int = 256,
+        on_sent: Optional[Callable[[Frame], None]] = None,
+        deltas: bool = False,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r} (expected one of {POLICIES})")
+        self.cid = cid
+        self.ws = ws
+        self.codec = codec
+        self.policy = policy
+        self.maxsize = max(int(maxsize), 1)
+        self.max_lag = max(int(max_lag), 1)
+        self._on_sent = on_sent
+        self.deltas = deltas      # codec carries delta frames (legacy clients always get full ones)
+        self._synced: Dict[str, int] = {}   # symbol → id of the last frame that set it for this client
+        self._frames: Deque[Frame] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closing = False
+        # counters
+        self.sent = 0
+        self.dropped = 0          # frames discarded by the policy (never written)
+        self.lagging = 0          # frames that had to queue behind unsent ones
+        self.max_depth = 0
+        self.events_sent = 0      # records written (a block frame counts each record)
+        self.resyncs = 0          # delta frames written in full (their base never reached this client)
+        # delivery, from receiver ACKs
+        self.acked = 0            # records the receiver confirmed
+        self.acked_seq: Optional[int] = None
+        self.acked_id: Optional[int] = None
+        self.ack_frames = 0
+
+    # ---------- producer side (hub loop, never awaits) ----------
+    def offer(self, frame: Frame) -> None:
+        if self.closing:
+            return
+        q = self._frames
+        if q:
+            self.lagging += 1
+            if self.policy == COALESCE and frame.seq is not None:
+                kept = [f for f in q if f.catch_up or f.seq is None or f.seq >= frame.seq]
+                self.dropped += len(q) - len(kept)
+                q.clear()
+                q.extend(kept)
+        if self.policy == DISCONNECT:
+            if len(q) >= self.max_lag:
+                self._disconnect(f"consumer lagging {len(q)} frames")
+                return
+        else:
+            while len(q) >= self.maxsize:
+                q.popleft()
+                self.dropped += 1
+        q.append(frame)
+        if len(q) > self.max_depth:
+            self.max_depth = len(q)
+        self._wake.set()
+
+    # ---------- writer task ----------
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self._run(), name=f"ws-hub-send-{self.cid}")
+        return self._task
+
+    async def _run(self) -> None:
+        q = self._frames
+        while True:
+            if not q:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            frame = q.popleft()
+            wire = frame.wires[self.codec]
+            synced = not self.deltas or self._holds(frame.bases)
+            if not synced and frame.full is not None:
+                wire = frame.full(self.codec)
+                synced = True
+                self.resyncs += 1
+            await self.ws.send(wire)  # backpressure lands here, on this client only
+            if synced and self.deltas and frame.id is not None:
+                for sym in frame.symbols:
+                    self._synced[sym] = frame.id
+            self.sent += 1
+            self.events_sent += len(frame.events) if isinstance(frame.events, list) else 1
+            if self._on_sent is not None:
+                self._on_sent(frame)
+
+    def _holds(self, bases: Optional[Dict[str, Optional[int]]]) -> bool:
+        """Client already has (or is past) every base frame; dropped frames never advance _synced."""
+        if not bases:
+            return True
+        synced = self._synced
+        return all(base is None or synced.get(sym, -1) >= base for sym, base in bases.items())
+
+    async def stop(self) -> None:
+        self.closing = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await self._task
+
+    def _disconnect(self, reason: str) -> None:
+        self.closing = True
+        self.dropped += len(self._frames)
+        self._frames.clear()
+        if self._task is not None:
+            self._task.cancel()
+        asyncio.create_task(self.ws.close(CLOSE_TOO_SLOW, reason))
+
+    # ---------- receiver ACKs ----------
+    def on_ack(self, seq: Optional[int], n: int, msg_id: Optional[int] = None) -> None:
+        """Cumulative ACK: `n` more records processed, the highest at sequence `seq` / message `msg_id`."""
+        self.ack_frames += 1
+        self.acked += max(int(n), 0)
+        if isinstance(seq, int) and (self.acked_seq is None or seq > self.acked_seq):
+            self.acked_seq = seq
+        if isinstance(msg_id, int) and (self.acked_id is None or msg_id > self.acked_id):
+            self.acked_id = msg_id
+
+    # ---------- stats ----------
+    @property
+    def depth(self) -> int:
+        return len(self._frames)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "codec": self.codec,
+            "policy": self.policy,
+            "sent": self.sent,
+            "resyncs": self.resyncs,
+            "dropped": self.dropped,
+            "lagging": self.lagging,
+            "depth": len(self._frames),
+            "max_depth": self.max_depth,
+            "acked": self.acked,
+            "acked_seq": self.acked_seq,
+            "acked_id": self.acked_id,
+            "unacked": max(self.events_sent - self.acked, 0),
+            "ack_frames": self.ack_frames,
+        }
@@ -44,5 +44,14 @@
     def clients_delta(self, prev: int, now: int):
         print(f"👥 [{self.role}] Clients {prev}→{now}")
 
+    def slow_client(self, cid: str, dropped: int, lagging: int):
+        print(f"🐢 [{self.role}] Client id={cid} dropped={dropped} lagging={lagging}")
+
+    def replay(self, frames: int, gap: bool):
+        print(f"🔁 [{self.role}] Replay: {frames} frame(s)" + (" — gap, older frames were lost" if gap else ""))
+
+    def snapshot(self, states: int, events: int):
+        print(f"🗂️ [{self.role}] Snapshot: {states} state(s), {events} event(s)")
+
     def stopped_by_user(self):
         print(f"\n🟥 [{self.role}] Stopped by user.")
@@ -0,0 +1,81 @@
+# state_snapshot.py
+# Latest broadcast state per (symbol, timeframe, side), kept by the hub so a receiver that joins
+# between sequences gets the current picture at once instead of waiting for the next send().
+# A block replaces the state of every key it carries; keys of the same symbol it no longer
+# carries are cleared (an aggr sequence is the full set of live divergences for its symbol).
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+StateKey = Tuple[str, Optional[int], str]   # (symbol, tf_sec, side)
+
+NO_SYMBOL = "-"   # events that carry no ticker/symbol/market
+
+
+def as_event(obj: Any) -> Optional[DivergenceEvent]:
+    """A hub payload element as an event (DivergenceEvent or wire dict); None for anything else."""
+    if isinstance(obj, DivergenceEvent):
+        return obj
+    if isinstance(obj, dict) and isinstance(obj.get("thread_id"), str):
+        return DivergenceEvent.from_dict(obj)
+    return None
+
+
+def symbol_of(ev: DivergenceEvent) -> str:
+    """Symbol as the event carries it; grouping only, no normalization (that lives in the preprocessor)."""
+    raw = ev.get_extra("ticker") or ev.get_extra("symbol") or ev.get_extra("market")
+    return raw.strip() if isinstance(raw, str) and raw.strip() else NO_SYMBOL
+
+
+class LatestState:
+    def __init__(self):
+        self._by_key: Dict[StateKey, Dict[str, DivergenceEvent]] = {}   # key → thread_id → event
+        self._seq: Dict[StateKey, Optional[int]] = {}
+
+    def update(self, item: Any) -> None:
+        """Fold one hub payload (block or single event) into the latest state."""
+        block = isinstance(item, list)
+        groups: Dict[StateKey, Dict[str, DivergenceEvent]] = {}
+        for obj in (item if block else (item,)):
+            ev = as_event(obj)
+            if ev is None:
+                continue
+            groups.setdefault((symbol_of(ev), ev.tf_sec, ev.side), {})[ev.thread_id] = ev
+
+        if block:
+            symbols = {k[0] for k in groups}
+            for key in [k for k in self._by_key if k[0] in symbols and k not in groups]:
+                del self._by_key[key]
+                self._seq.pop(key, None)
+            for key, threads in groups.items():
+                self._by_key[key] = threads
+                self._seq[key] = max(ev.sequence for ev in threads.values())
+        else:  # a lone event upserts its thread
+            for key, threads in groups.items():
+                self._by_key.setdefault(key, {}).update(threads)
+                self._seq[key] = max(self._seq.get(key) or 0, *(ev.sequence for ev in threads.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self._by_key)
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def states(self) -> List[Dict[str, Any]]:
+        """One entry per key, oldest sequence first (receivers enforce per-hub sequence order)."""
+        keys = sorted(self._by_key, key=lambda k: (self._seq.get(k) or 0, k[0], k[1] or 0, k[2]))
+        return [
+            {"symbol": k[0], "tf_sec": k[1], "side": k[2], "sequence": self._seq.get(k),
+             "events": list(self._by_key[k].values())}
+            for k in keys
+        ]
+
+    def events(self) -> List[DivergenceEvent]:
+        return [ev for st in self.states() for ev in st["events"]]
+
+    def clear(self) -> None:
+        self._by_key.clear()
+        self._seq.clear()
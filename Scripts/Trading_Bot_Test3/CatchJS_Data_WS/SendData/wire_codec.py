@@ -0,0 +1,306 @@
+# wire_codec.py
+# Encodings for hub ↔ receiver frames, negotiated per connection through the WebSocket
+# subprotocol header. Receivers offer what they can decode; the hub picks by its preference
+# (msgpack → struct → json). Clients that offer nothing keep getting bare JSON text frames.
+# Negotiated connections get each broadcast wrapped with its hub message id
+# ({"type": "frame", "id", "data"}) so a receiver can resume after a reconnect, and blocks that
+# mostly repeat the previous one go out as deltas ({"type": "delta", ...}, see block_delta).
+#
+#   legacy  : bare JSON text frames, no ids (clients that negotiate nothing)
+#   json    : text frames
+#   msgpack : binary, any JSON-like value (needs the optional `msgpack` package)
+#   struct  : binary, fixed little-endian layout for divergence records; anything that
+#             isn't exactly a record block (control messages, ACKs, dicts the record layout
+#             would normalize) rides along as tagged JSON, so every payload round-trips
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent, to_wire
+
+try:  # optional
+    import msgpack as _msgpack
+except ImportError:
+    _msgpack = None
+
+LEGACY = "legacy"
+JSON = "json"
+MSGPACK = "msgpack"
+STRUCT = "struct"
+
+_SUBPROTO_PREFIX = "aggr.div."   # Sec-WebSocket-Protocol value: aggr.div.<codec>
+
+
+class Codec:
+    name = JSON
+    binary = False
+
+    def encode(self, obj: Any) -> Any:
+        return json.dumps(to_wire(obj))
+
+    def encode_frame(self, msg_id: int, obj: Any) -> Any:
+        """A broadcast payload tagged with its hub message id."""
+        return self.encode({"type": FRAME, "id": msg_id, "data": to_wire(obj)})
+
+    def decode(self, data: Any) -> Any:
+        return json.loads(data)
+
+
+class LegacyCodec(Codec):
+    name = LEGACY
+
+    def encode_frame(self, msg_id: int, obj: Any) -> Any:
+        return self.encode(obj)  # old receivers: bare payload, ids never leave the hub
+
+
+class MsgpackCodec(Codec):
+    name = MSGPACK
+    binary = True
+
+    def encode(self, obj: Any) -> bytes:
+        return _msgpack.packb(to_wire(obj), use_bin_type=True)
+
+    def decode(self, data: Any) -> Any:
+        if isinstance(data, str):  # peer fell back to text
+            return json.loads(data)
+        return _msgpack.unpackb(data, raw=False)
+
+
+# -------------------- struct layout --------------------
+# frame  : tag u8 | count u16 | [id Q] | record*count | extras
+#          (tag 1 = block, 2 = single record, 3/4 = same with hub message id)
+#          tag 0 | utf-8 JSON                               (anything else)
+# record : sequence q | tf_sec i | l1_time q | l1_price d | l2_time q | l2_price d
+#          | h1_time q | h1_price d | cvd_l1 d | cvd_l2 d | v B | present H
+#          | thread_id, status, side, pair_id, source : u8 len + utf-8
+#          present: bits 0-9 = field set (_OPTIONAL order), bits 10-14 = that d field held an int
+# extras : utf-8 JSON list, one entry (or null) per record — a single dumps/loads per frame
+_TAG_JSON, _TAG_BLOCK, _TAG_SINGLE, _TAG_BLOCK_ID, _TAG_SINGLE_ID = 0, 1, 2, 3, 4
+_HEAD = struct.Struct("<BH")
+_ID = struct.Struct("<Q")
+_FIXED = struct.Struct("<qiqdqdqdddBH")
+_U8 = struct.Struct("<B")
+_OPTIONAL = ("tf_sec", "l1_time", "l1_price", "l2_time", "l2_price",
+             "h1_time", "h1_price", "cvd_l1", "cvd_l2", "pair_id")  # bit i set → field present
+_STRS = ("thread_id", "status", "side", "pair_id", "source")
+_INT_BITS = (1024, 2048, 4096, 8192, 16384)  # l1_price, l2_price, h1_price, cvd_l1, cvd_l2 were ints
+_MAX_EXACT = 2 ** 53                         # ints a double holds exactly
+
+
+def _pack_record(out: List[bytes], ev: DivergenceEvent) -> None:
+    """Raises TypeError/ValueError when a field wouldn't come back as the same type and value."""
+    tf, l1t, l1p, l2t, l2p = ev.tf_sec, ev.l1_time, ev.l1_price, ev.l2_time, ev.l2_price
+    h1t, h1p, c1, c2 = ev.h1_time, ev.h1_price, ev.cvd_l1, ev.cvd_l2
+    if (type(ev.sequence) is not int or type(ev.v) is not int
+            or any(x is not None and type(x) is not int for x in (tf, l1t, l2t, h1t))
+            or any(type(x) is not str for x in (ev.thread_id, ev.status, ev.side, ev.source))
+            or (ev.pair_id is not None and type(ev.pair_id) is not str)):
+        raise TypeError("not a struct record")
+    present = ((tf is not None) | (l1t is not None) << 1 | (l1p is not None) << 2 | (l2t is not None) << 3
+               | (l2p is not None) << 4 | (h1t is not None) << 5 | (h1p is not None) << 6
+               | (c1 is not None) << 7 | (c2 is not None) << 8 | (ev.pair_id is not None) << 9)
+    for bit, x in zip(_INT_BITS, (l1p, l2p, h1p, c1, c2)):
+        if x is None or type(x) is float:
+            continue
+        if type(x) is not int or not -_MAX_EXACT <= x <= _MAX_EXACT:
+            raise TypeError("not a struct record")
+        present |= bit
+    out.append(_FIXED.pack(
+        ev.sequence, tf or 0, l1t or 0, l1p or 0.0, l2t or 0, l2p or 0.0,
+        h1t or 0, h1p or 0.0, c1 or 0.0, c2 or 0.0, ev.v, present,
+    ))
+    for s in (ev.thread_id, ev.status, ev.side, ev.pair_id, ev.source):
+        b = (s or "").encode("utf-8")
+        if len(b) > 255:
+            raise ValueError("string field longer than 255 bytes")
+        out.append(_U8.pack(len(b)))
+        out.append(b)
+
+
+def _unpack_record(buf: memoryview, off: int) -> Tuple[DivergenceEvent, int]:
+    (seq, tf, l1t, l1p, l2t, l2p, h1t, h1p, c1, c2, v, p) = _FIXED.unpack_from(buf, off)
+    off += _FIXED.size
+    strs = []
+    for _ in _STRS:
+        n = buf[off]
+        strs.append(str(buf[off + 1:off + 1 + n], "utf-8"))
+        off += 1 + n
+    if p & 31744:  # some d fields were ints
+        l1p, l2p, h1p, c1, c2 = (int(x) if p & bit else x for bit, x in zip(_INT_BITS, (l1p, l2p, h1p, c1, c2)))
+    ev = DivergenceEvent(  # bit order = _OPTIONAL
+        strs[0], seq, strs[2], strs[1],
+        tf if p & 1 else None, strs[3] if p & 512 else None,
+        l1t if p & 2 else None, l1p if p & 4 else None,
+        l2t if p & 8 else None, l2p if p & 16 else None,
+        h1t if p & 32 else None, h1p if p & 64 else None,
+        c1 if p & 128 else None, c2 if p & 256 else None,
+        v, strs[4],
+    )
+    return ev, off
+
+
+def _as_record(obj: Any) -> Optional[DivergenceEvent]:
+    """DivergenceEvent, or a dict that is exactly one's wire form (from_dict would otherwise add
+    defaults / flatten pivots); None → not a record."""
+    if isinstance(obj, DivergenceEvent):
+        return obj
+    if isinstance(obj, dict) and isinstance(obj.get("sequence"), int) and isinstance(obj.get("thread_id"), str):
+        ev = DivergenceEvent.from_dict(obj)
+        if ev.to_dict() == obj:
+            return ev
+    return None
+
+
+class StructCodec(Codec):
+    name = STRUCT
+    binary = True
+    fallbacks = 0   # record payloads that had to go out as tagged JSON (see _pack_record)
+
+    def _pack(self, obj: Any, msg_id: Optional[int]) -> bytes:
+        items = obj if isinstance(obj, list) else [obj]
+        records = [_as_record(o) for o in items]
+        if items and all(r is not None for r in records) and len(items) <= 0xFFFF:
+            single = not isinstance(obj, list)
+            if msg_id is None:
+                out: List[bytes] = [_HEAD.pack(_TAG_SINGLE if single else _TAG_BLOCK, len(records))]
+            else:
+                out = [_HEAD.pack(_TAG_SINGLE_ID if single else _TAG_BLOCK_ID, len(records)), _ID.pack(msg_id)]
+            try:
+                for r in records:
+                    _pack_record(out, r)
+                out.append(json.dumps([r.extra for r in records], separators=(",", ":")).encode("utf-8"))
+                return b"".join(out)
+            except (struct.error, ValueError, TypeError):  # out-of-range / odd-typed field → lossless fallback
+                StructCodec.fallbacks += 1
+        wire = to_wire(obj) if msg_id is None else {"type": FRAME, "id": msg_id, "data": to_wire(obj)}
+        return _U8.pack(_TAG_JSON) + json.dumps(wire).encode("utf-8")
+
+    def encode(self, obj: Any) -> bytes:
+        return self._pack(obj, None)
+
+    def encode_frame(self, msg_id: int, obj: Any) -> bytes:
+        return self._pack(obj, msg_id)
+
+    def decode(self, data: Any) -> Any:
+        """Wire dicts, same shape json.loads gives for the JSON codec."""
+        if isinstance(data, str):
+            return json.loads(data)
+        buf = memoryview(data)
+        tag = buf[0]
+        if tag == _TAG_JSON:
+            return json.loads(bytes(buf[1:]))
+        _tag, count = _HEAD.unpack_from(buf, 0)
+        off = _HEAD.size
+        msg_id = None
+        if tag in (_TAG_BLOCK_ID, _TAG_SINGLE_ID):
+            (msg_id,) = _ID.unpack_from(buf, off)
+            off += _ID.size
+        events = []
+        for _ in range(count):
+            ev, off = _unpack_record(buf, off)
+            events.append(ev)
+        for ev, extra in zip(events, json.loads(bytes(buf[off:]))):
+            ev.extra = extra
+        out = [ev.to_dict() for ev in events]
+        data = out if tag in (_TAG_BLOCK, _TAG_BLOCK_ID) else out[0]
+        return data if msg_id is None else {"type": FRAME, "id": msg_id, "data": data}
+
+
+# -------------------- negotiation --------------------
+_CODECS: Dict[str, Codec] = {LEGACY: LegacyCodec(), JSON: Codec(), STRUCT: StructCodec()}
+if _msgpack is not None:
+    _CODECS[MSGPACK] = MsgpackCodec()
+
+PREFERENCE = (MSGPACK, STRUCT, JSON)
+
+
+def available() -> Tuple[str, ...]:
+    return tuple(n for n in PREFERENCE if n in _CODECS)
+
+
+def get(name: Optional[str]) -> Codec:
+    return _CODECS.get(name or LEGACY, _CODECS[LEGACY])
+
+
+def subprotocols(names: Optional[Tuple[str, ...]] = None) -> List[str]:
+    """Sec-WebSocket-Protocol values to offer/accept, in preference order."""
+    return [_SUBPROTO_PREFIX + n for n in (names or available()) if n in _CODECS]
+
+
+def from_subprotocol(subprotocol: Optional[str]) -> Codec:
+    if subprotocol and subprotocol.startswith(_SUBPROTO_PREFIX):
+        return get(subprotocol[len(_SUBPROTO_PREFIX):])
+    return _CODECS[LEGACY]
+
+
+def select(offered, accepted: List[str]) -> Optional[str]:
+    """Hub side: first accepted subprotocol the client offered; None → legacy JSON, never reject."""
+    offered = set(offered or ())
+    for sp in accepted:
+        if sp in offered:
+            return sp
+    return None
+
+
+# -------------------- control messages --------------------
+# Small dicts that share the connection with record frames (struct sends them as tagged JSON).
+ACK = "ack"          # receiver → hub
+FRAME = "frame"      # hub → receiver: one broadcast with its message id
+REPLAY = "replay"    # hub → receiver: missed frames in one bulk message after a resume
+SNAPSHOT = "snapshot"  # hub → receiver: latest state per (symbol, tf, side) on connect
+DELTA = "delta"      # hub → receiver: a block as added/changed/removed threads (block_delta)
+HELLO = "hello"      # hub → receiver: this hub run's epoch, when the connection gets no replay/snapshot
+
+
+def ack(seq: Optional[int], n: int, msg_id: Optional[int] = None) -> Dict[str, Any]:
+    """Cumulative receiver ACK: `n` more records processed since the last one, highest at `seq` / `msg_id`."""
+    return {"type": ACK, "seq": seq, "n": n, "id": msg_id}
+
+
+def replay(frames: List[Tuple[int, Any]], *, gap: bool, epoch: Optional[str] = None) -> Dict[str, Any]:
+    """Bulk catch-up; `gap` → some frames after the receiver's id already fell out of the buffer."""
+    return {"type": REPLAY, "gap": gap, "epoch": epoch,
+            "frames": [{"id": i, "data": to_wire(obj)} for i, obj in frames]}
+
+
+def snapshot(msg_id: int, states: List[Dict[str, Any]], epoch: Optional[str] = None) -> Dict[str, Any]:
+    """Latest state as of hub message `msg_id`; states come from state_snapshot.LatestState.states()."""
+    return {"type": SNAPSHOT, "id": msg_id, "epoch": epoch,
+            "states": [{**st, "events": to_wire(st["events"])} for st in states]}
+
+
+def hello(epoch: str, msg_id: int) -> Dict[str, Any]:
+    """Hub run `epoch` (message ids restart with it), latest id `msg_id`; carries no records."""
+    return {"type": HELLO, "epoch": epoch, "id": msg_id}
+
+
+def delta(msg_id: int, seq: Optional[int], parts: List[Dict[str, Any]],
+          order: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """Block `msg_id` as per-symbol diffs from block_delta.BlockDiff; unchanged threads take `seq`.
+    `order` ((symbol, thread_id) per record) only when the block's symbols interleave."""
+    msg = {"type": DELTA, "id": msg_id, "seq": seq,
+           "parts": [{**p, "added": to_wire(p["added"]), "changed": to_wire(p["changed"])} for p in parts]}
+    if order:
+        msg["order"] = [list(o) for o in order]
+    return msg
+
+
+def unwrap(msg: Any) -> List[Tuple[Optional[int], Any]]:
+    """Receiver side: (message id, payload) pairs in a decoded message; bare payloads get id None.
+    A delta comes back as itself: block_delta.BlockState.apply() turns it into the full block."""
+    if isinstance(msg, dict):
+        kind = msg.get("type")
+        if kind == FRAME:
+            return [(msg.get("id"), msg.get("data"))]
+        if kind == REPLAY:
+            return [(f.get("id"), f.get("data")) for f in msg.get("frames") or () if isinstance(f, dict)]
+        if kind == SNAPSHOT:
+            return [(msg.get("id"), [ev for st in msg.get("states") or () for ev in st.get("events") or ()])]
+        if kind == DELTA:
+            return [(msg.get("id"), msg)]
+        if kind == HELLO:
+            return []
+    return [(None, msg)]
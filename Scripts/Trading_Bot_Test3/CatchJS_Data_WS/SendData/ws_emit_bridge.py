@@ -1,14 +1,33 @@
 ﻿# ws_emit_bridge.py  — HUB (server) that broadcasts payloads to all connected clients
-import json
+# A block goes out as one JSON array frame (or batch_size chunks), offered to every client's own
+# bounded queue (client_channel.ClientChannel); a stalled receiver only backs up its own lane.
+# Each client negotiates its encoding (wire_codec: msgpack/struct/json); a frame is encoded once per codec in use.
+# Frames get monotonic message ids and stay in a bounded replay ring; a receiver reconnecting with
+# ?resume=<last id> gets everything it missed in one bulk replay before the live stream continues.
+# A new client (or one whose resume point fell out of the ring) first gets a snapshot of the latest
+# state per (symbol, tf, side), then only the live frames after it.
+# Message ids restart with every hub run, so each run has a random epoch: receivers send it back as
+# ?epoch=<token> with their resume id, and a resume from another run (or past the last id) gets a
+# snapshot instead. The epoch rides on the replay/snapshot, or on a hello when neither is due.
+# A block that mostly repeats the previous one for its symbol goes to negotiated clients as a delta
+# (added/changed/removed threads + the new sequence, see block_delta); legacy clients get it in full.
 import threading
 import asyncio
+import secrets
+from collections import deque
 from contextlib import suppress
-from typing import Optional, Set, Dict
+from typing import Any, Deque, Dict, Optional, Tuple
 from itertools import count
+from urllib.parse import parse_qs, urlsplit
 
 import websockets
 from websockets import WebSocketServerProtocol, ConnectionClosedOK, ConnectionClosedError
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.log_uniform import UniformLogger
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.client_channel import ClientChannel, Frame, DROP_OLDEST, POLICIES
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.state_snapshot import LatestState
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.block_delta import BlockDiff
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import latency
 
 log = UniformLogger("WS-HUB")
 
@@ -17,14 +36,31 @@ _loop: Optional[asyncio.AbstractEventLoop] = None
 _thread: Optional[threading.Thread] = None
 _stop_evt = threading.Event()
 
-_clients: Set[WebSocketServerProtocol] = set()
-_client_ids: Dict[WebSocketServerProtocol, str] = {}
+_clients: Dict[WebSocketServerProtocol, ClientChannel] = {}
 _id_counter = count(1)
 
 _queue: Optional[asyncio.Queue] = None
+_queue_dropped = 0            # payloads evicted from the hub queue (oldest first) when send() outpaces it
+
+_msg_ids = count(1)           # hub message id per broadcast frame
+_last_id = 0
+_epoch = secrets.token_hex(8)  # this hub run: message ids only mean something within it
+_ring: Deque[Frame] = deque(maxlen=1024)  # recent frames for resuming receivers (start_server(replay_size=...))
+_replays = 0                  # resumes served (incl. empty / gap-only)
+_state = LatestState()        # latest block per (symbol, tf, side) for late joiners
+_snapshots = 0
+_diff = BlockDiff()           # previous block per symbol, by thread_id
+_deltas = 0                   # blocks that went out as deltas
 
 _HOST = "127.0.0.1"
 _PORT = 8765
+_BATCH_SIZE = 0               # events per frame for list payloads; 0 → whole block in one frame
+_POLICY = DROP_OLDEST         # slow-consumer policy per client: drop_oldest | coalesce | disconnect
+_CLIENT_QUEUE = 64            # frames buffered per client (drop_oldest / coalesce)
+_MAX_LAG = 256                # frames behind before the disconnect policy closes a client
+_SUBPROTOCOLS = wire_codec.subprotocols()  # encodings the hub accepts, preferred first
+_SNAPSHOT = True              # send the latest state to clients that can't resume
+_DELTA = True                 # diff blocks against the previous one per symbol (needs _BATCH_SIZE 0)
 SERVE_KW = dict(ping_interval=20, ping_timeout=20, close_timeout=1, max_size=None)
 
 # Logging toggles (default silent)
@@ -48,63 +84,198 @@ def _peer(ws: WebSocketServerProtocol) -> str:
     return str(ra or "<unknown>")
 
 # === Internals ============================================================
+def _seq_of(item) -> Optional[int]:
+    first = item[0] if isinstance(item, list) and item else item
+    seq = first.get("sequence") if isinstance(first, dict) else getattr(first, "sequence", None)
+    return seq if isinstance(seq, int) else None
+
+def _full_wire(msg_id: int, obj):
+    """codec name → full encoding of a delta frame, built on first use (only clients missing its base)."""
+    cache: Dict[str, Any] = {}
+    def full(name: str):
+        if name not in cache:
+            cache[name] = wire_codec.get(name).encode_frame(msg_id, obj)
+        return cache[name]
+    return full
+
+def _frame(obj, seq, codecs) -> Frame:
+    global _last_id, _deltas
+    _last_id = msg_id = next(_msg_ids)
+    if not _DELTA:
+        wires = {name: wire_codec.get(name).encode_frame(msg_id, obj) for name in codecs}  # records leave the process only here
+        frame = Frame(msg_id, wires, seq, obj)
+    else:
+        delta = _diff.update(obj, msg_id, seq)
+        if delta.parts is None:  # a full block needs no base; a lone event extends its symbol's
+            wires = {name: wire_codec.get(name).encode_frame(msg_id, obj) for name in codecs}
+            frame = Frame(msg_id, wires, seq, obj, delta.symbols, None if isinstance(obj, list) else delta.bases)
+        else:
+            _deltas += 1
+            msg = wire_codec.delta(msg_id, seq, delta.parts, delta.order)
+            wires = {name: wire_codec.get(name).encode_frame(msg_id, obj) if name == wire_codec.LEGACY
+                     else wire_codec.get(name).encode(msg) for name in codecs}
+            frame = Frame(msg_id, wires, seq, obj, delta.symbols, delta.bases, _full_wire(msg_id, obj))
+    _ring.append(frame)
+    return frame
+
+def _frames(item, codecs):
+    """Frames for one payload: a block is encoded once per batch and codec, a single event stays an object."""
+    seq = _seq_of(item)
+    if not isinstance(item, list):
+        yield _frame(item, seq, codecs)
+        return
+    step = _BATCH_SIZE if _BATCH_SIZE > 0 else max(len(item), 1)
+    for i in range(0, len(item), step):
+        yield _frame(item[i:i + step], seq, codecs)
+
+def _resume_from(ws) -> Tuple[Optional[int], Optional[str]]:
+    """(last message id, hub epoch) the receiver saw, from ?resume=<id>&epoch=<token> (None → fresh client)."""
+    req = getattr(ws, "request", None)
+    path = getattr(req, "path", None) or getattr(ws, "path", None) or ""
+    query = parse_qs(urlsplit(path).query)
+    epoch = (query.get("epoch") or [None])[0]
+    try:
+        return int(query["resume"][0]), epoch
+    except (KeyError, IndexError, ValueError):
+        return None, epoch
+
+def _can_replay(after_id: int, epoch: Optional[str]) -> bool:
+    """`after_id` is from this hub run and the ring still holds every frame after it."""
+    if epoch != _epoch or after_id > _last_id:  # another run's ids (hub restarted): they mean nothing here
+        return False
+    first = _ring[0].id if _ring else _last_id + 1
+    return first <= after_id + 1
+
+def _block_symbols(frames) -> tuple:
+    """Symbols a catch-up sets in full: those of every block among `frames` (a lone event only extends)."""
+    syms: Dict[str, None] = {}
+    for f in frames:
+        if isinstance(f.events, list):
+            syms.update(dict.fromkeys(f.symbols))
+    return tuple(syms)
+
+def _snapshot_frame(codec) -> Optional[Frame]:
+    """Latest state as one message (legacy clients: the events as a bare block)."""
+    global _snapshots
+    if not _state:
+        return None
+    _snapshots += 1
+    states = _state.states()
+    events = [ev for st in states for ev in st["events"]]
+    if codec.name == wire_codec.LEGACY:
+        wire = codec.encode(events)
+    else:
+        wire = codec.encode(wire_codec.snapshot(_last_id, states, _epoch))
+    # grouped by (tf, side), not in block order: no delta base, the next block per symbol goes out in full
+    return Frame(_last_id, {codec.name: wire}, states[-1]["sequence"], events, catch_up=True)
+
+def _hello_frame(codec) -> Frame:
+    return Frame(None, {codec.name: codec.encode(wire_codec.hello(_epoch, _last_id))}, None, [], catch_up=True)
+
+def _catch_up_frame(ws, codec) -> Optional[Frame]:
+    """What a new connection gets before live frames: a replay if it can resume, else a snapshot
+    (negotiated clients always get one message carrying the hub epoch: a hello if nothing else is due)."""
+    if codec.name == wire_codec.LEGACY:
+        return _snapshot_frame(codec) if _SNAPSHOT else None
+    after, epoch = _resume_from(ws)
+    frame = None
+    if after is not None and _can_replay(after, epoch):
+        frame = _replay_frame(codec, after)
+    elif _SNAPSHOT:
+        frame = _snapshot_frame(codec)
+    elif after is not None:  # nothing to rebuild from: replay the whole ring, flagged as a gap
+        frame = _replay_frame(codec, 0, gap=True)
+    return frame if frame is not None else _hello_frame(codec)
+
+def _replay_frame(codec, after_id: int, *, gap: bool = False) -> Optional[Frame]:
+    """Everything after `after_id` still in the ring as ONE message; gap → older frames were already evicted."""
+    global _replays
+    missed = [f for f in _ring if f.id > after_id]
+    first = missed[0].id if missed else _last_id + 1
+    gap = gap or first > after_id + 1
+    if not missed and not gap:
+        return None
+    _replays += 1
+    events = []
+    for f in missed:
+        events.extend(f.events if isinstance(f.events, list) else (f.events,))
+    wire = codec.encode(wire_codec.replay([(f.id, f.events) for f in missed], gap=gap, epoch=_epoch))
+    if not missed:
+        return Frame(None, {codec.name: wire}, None, events, catch_up=True)
+    return Frame(missed[-1].id, {codec.name: wire}, missed[-1].seq, events, _block_symbols(missed), catch_up=True)
+
+def _on_reply(ch: ClientChannel, codec, msg) -> None:
+    """Receiver → hub: cumulative ACKs feed the client's delivery counters (legacy per-object ACKs count 1)."""
+    try:
+        reply = codec.decode(msg)
+    except Exception:
+        _log("got_reply", f"[{ch.cid}] {msg!r}")
+        return
+    if isinstance(reply, dict):
+        if reply.get("type") == wire_codec.ACK:
+            ch.on_ack(reply.get("seq"), reply.get("n", 0), reply.get("id"))
+        elif reply.get("message") == "receiver ack":
+            ch.on_ack(None, 1)
+    _log("got_reply", f"[{ch.cid}] {reply}")
+
+def _select_subprotocol(_connection, offered):
+    return wire_codec.select(offered, _SUBPROTOCOLS)  # nothing shared → plain JSON, never refuse
+
+def _on_sent(frame: Frame) -> None:
+    latency.mark("send", frame.events)  # first client to get it closes the latency record
+
 async def _broadcast_worker():
-    """Takes dict or list payloads and broadcasts JSON to all clients."""
-    global _waiting_logged
+    """Takes event/dict or list payloads and hands each encoded frame to every client's queue."""
     assert _queue is not None
     while not _stop_evt.is_set():
         item = await _queue.get()
         if item is None:
             break
 
-        items = item if isinstance(item, list) else [item]
-        for elem in items:
-            wire = json.dumps(elem)
-            _log_sent_wire(wire)  # 📤 [WS-HUB] Sent (json)   : {...}
-
-            dead = []
-            for ws in list(_clients):
-                try:
-                    await ws.send(wire)
-                except Exception:
-                    cid = _client_ids.get(ws, "<unknown>")
-                    _log("disconnected", "?", f"send failed (id={cid}, peer={_peer(ws)})")
-                    dead.append(ws)
-
-            if dead:
-                prev = len(_clients)
-                for ws in dead:
-                    _clients.discard(ws)
-                    _client_ids.pop(ws, None)
-                now = len(_clients)
-                if now > 0 and prev != now:
-                    log.clients_delta(prev, now)
-                elif now == 0 and not _waiting_logged:
-                    _log("waiting")
-                    _waiting_logged = True
+        if _SNAPSHOT:
+            _state.update(item)
+        channels = list(_clients.values())
+        codecs = {ch.codec for ch in channels}
+        if _LOG_WIRE:
+            codecs.add(wire_codec.LEGACY)
+        for frame in _frames(item, codecs):
+            if _LOG_WIRE:
+                _log_sent_wire(frame.wires[wire_codec.LEGACY])  # 📤 [WS-HUB] Sent (json)   : {...}
+            if not channels:
+                _on_sent(frame)
+                continue
+            for ch in channels:
+                ch.offer(frame)  # never awaits; each client's writer task drains its own queue
 
 
 async def _handler(ws: WebSocketServerProtocol):
-    """Accept connections; read ACKs so we can log them with client IDs."""
+    """Accept connections; read ACKs to track per-client delivery (and log them with client IDs)."""
     global _waiting_logged
     cid = f"C{next(_id_counter)}"
+    codec = wire_codec.from_subprotocol(ws.subprotocol)
+    ch = ClientChannel(cid, ws, codec=codec.name, policy=_POLICY, maxsize=_CLIENT_QUEUE, max_lag=_MAX_LAG,
+                       on_sent=_on_sent, deltas=codec.name != wire_codec.LEGACY)
+
+    catch_up = _catch_up_frame(ws, codec)
+    if catch_up is not None:
+        ch.offer(catch_up)  # queued before any live frame: no await until the client is registered
 
     prev = len(_clients)
-    _clients.add(ws)
-    _client_ids[ws] = cid
+    _clients[ws] = ch
+    ch.start()
     now = len(_clients)
 
     _log("connected")
     _log("ready")
-    log.client_link(cid, _peer(ws))
+    log.client_link(cid, f"{_peer(ws)} wire={codec.name}")
     if prev != now:
         log.clients_delta(prev, now)
     _waiting_logged = False  # at least one client connected
 
     logged_disc = False
     try:
-        async for msg in ws:  # receivers send ACKs; include id in log line
-            _log("got_reply", f"[{cid}] {msg}")
+        async for msg in ws:  # receivers send cumulative ACKs
+            _on_reply(ch, codec, msg)
     except (ConnectionClosedOK, ConnectionClosedError) as e:
         _log("disconnected", e.code, f"{e.reason} (id={cid}, peer={_peer(ws)})")
         logged_disc = True
@@ -119,9 +290,11 @@ async def _handler(ws: WebSocketServerProtocol):
             reason_out = (reason if reason else "no close frame received or sent") + f" (id={cid}, peer={_peer(ws)})"
             _log("disconnected", code_out, reason_out)
 
+        await ch.stop()
+        if ch.dropped:
+            _log("slow_client", cid, ch.dropped, ch.lagging)
         prev = len(_clients)
-        _clients.discard(ws)
-        _client_ids.pop(ws, None)
+        _clients.pop(ws, None)
         now = len(_clients)
 
         if now > 0 and prev != now:
@@ -136,7 +309,7 @@ async def _run_server():
     _log("starting")
     _queue = asyncio.Queue(maxsize=1000)
     _waiting_logged = False
-    async with websockets.serve(_handler, _HOST, _PORT, **SERVE_KW):
+    async with websockets.serve(_handler, _HOST, _PORT, select_subprotocol=_select_subprotocol, **SERVE_KW):
         # server idle at startup
         if not _waiting_logged:
             _log("waiting")
@@ -157,7 +330,15 @@ def start_server(
     port: int = 8765,
     *,
     noisylogs: bool = False,   # everything (incl. Sent json)
-    logs: bool = False         # without Sent json
+    logs: bool = False,        # without Sent json
+    batch_size: int = 0,       # events per frame; 0 → one frame per block
+    policy: str = DROP_OLDEST, # slow consumers: drop_oldest | coalesce | disconnect
+    client_queue: int = 64,    # frames buffered per client
+    max_lag: int = 256,        # disconnect policy: frames behind before closing
+    wire_formats=None,         # encodings to accept, e.g. ("struct", "json"); None → all available
+    replay_size: int = 1024,   # recent frames kept for receivers that reconnect with ?resume=<id>
+    snapshot: bool = True,     # new clients first get the latest state per (symbol, tf, side)
+    delta: bool = True         # blocks go to negotiated clients as diffs against the previous one
 ):
     """Start the hub server (idempotent).
     Args:
@@ -166,11 +347,33 @@ def start_server(
         logs: print all EXCEPT '📤 Sent (json)' lines
         If both False → print nothing.
         If both True  → print everything.
+        batch_size: split list payloads into frames of this many events (0 → whole block)
+        policy: what a client's queue does when it backs up:
+            'drop_oldest' → discard its oldest frame once client_queue is full
+            'coalesce'    → a newer sequence replaces its queued older live frames (catch-up stays)
+            'disconnect'  → close it (code 4008) once it is max_lag frames behind
+        wire_formats: codecs clients may negotiate (see wire_codec); clients that offer none get JSON
+        replay_size: frames the replay ring keeps; a resume point older than that gets a snapshot
+            (or, with snapshot=False, a replay flagged as a gap)
+        snapshot: keep the latest state per (symbol, tf, side) and send it to clients that can't resume
+        delta: send a block as its added/changed/removed threads + sequence when that is smaller;
+            a client that lacks the block it was diffed against gets it in full (ignored with batch_size)
     """
-    global _HOST, _PORT, _thread, _loop, _LOGS_ENABLED, _LOG_WIRE
+    global _HOST, _PORT, _BATCH_SIZE, _POLICY, _CLIENT_QUEUE, _MAX_LAG, _SUBPROTOCOLS, _ring, _SNAPSHOT, _DELTA, _thread, _loop, _LOGS_ENABLED, _LOG_WIRE, _epoch
     if _thread and _thread.is_alive():
         return
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy {policy!r} (expected one of {POLICIES})")
     _HOST, _PORT = host, port
+    _BATCH_SIZE = max(int(batch_size), 0)
+    _POLICY, _CLIENT_QUEUE, _MAX_LAG = policy, client_queue, max_lag
+    _SUBPROTOCOLS = wire_codec.subprotocols(tuple(wire_formats) if wire_formats else None)
+    _ring = deque(maxlen=max(int(replay_size), 1))
+    _epoch = secrets.token_hex(8)  # ring/state start empty: earlier resume points can't be served
+    _SNAPSHOT = bool(snapshot)
+    _state.clear()
+    _DELTA = bool(delta) and _BATCH_SIZE == 0  # a batch is only part of a block: nothing to diff it with
+    _diff.clear()
 
     # precedence: noisylogs True → everything
     if noisylogs:
@@ -199,16 +402,30 @@ def start_server(
     _thread.start()
 
 def send(payload):
-    """Enqueue payload (dict OR list) for broadcast to all connected clients."""
+    """Enqueue payload (DivergenceEvent / dict OR list of them) for broadcast to all connected clients."""
     if _loop is None or _queue is None:
         return
+    latency.mark("emit_enqueue", payload)
     def _try_put():
-        try:
-            _queue.put_nowait(payload)
-        except asyncio.QueueFull:
-            pass  # drop newest
+        global _queue_dropped
+        if _queue.full():  # keep the newest: evict the oldest pending payload
+            _queue.get_nowait()
+            _queue_dropped += 1
+        _queue.put_nowait(payload)
     _loop.call_soon_threadsafe(_try_put)
 
+def stats() -> Dict[str, Any]:
+    """Hub counters: payloads evicted from the hub queue, replay ring, and per client id sent/dropped/lagging/depth/acked."""
+    return {
+        "queue_dropped": _queue_dropped,
+        "last_id": _last_id,
+        "epoch": _epoch,
+        "replay": {"frames": len(_ring), "first_id": _ring[0].id if _ring else None, "resumes": _replays},
+        "snapshot": {"keys": len(_state), "sent": _snapshots},
+        "delta": {"symbols": len(_diff), "frames": _deltas},
+        "clients": {ch.cid: ch.stats() for ch in list(_clients.values())},
+    }
+
 def stop():
     """Stop the hub server."""
     global _thread
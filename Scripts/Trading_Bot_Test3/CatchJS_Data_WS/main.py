@@ -2,15 +2,18 @@
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData import playwright_session
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_preprocessor, sequence_order
 from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
-from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import printer
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import printer, latency
 import atexit
 
 ws_emit_bridge.start_server("127.0.0.1", 8765)
 atexit.register(ws_emit_bridge.stop)
+atexit.register(bybit_preprocessor.stop_worker)
+latency.start_reporter(60)  # one p50/p99-per-stage line a minute (capture → WS send)
 
 for raw_data in playwright_session.iter_blocks():
     ordered_raw_data = sequence_order.order_by_l1_time(raw_data)
     #printer.print_sequence(ordered_raw_data)
-    processed_data = bybit_preprocessor.process(ordered_raw_data)
+    # enrich on the async worker; console events keep flowing into the buffers meanwhile
+    processed_data = playwright_session.pump_until(bybit_preprocessor.submit(ordered_raw_data))
     printer.print_sequence(processed_data)
     ws_emit_bridge.send(processed_data)
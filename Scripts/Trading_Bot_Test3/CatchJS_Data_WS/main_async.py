@@ -0,0 +1,64 @@
+# async producer: capture → order → enrich → emit as concurrent stages on one event loop
+# A slow OHLCV fetch only delays its own block; capture keeps running and the
+# latest-wins queues hand the newest block to the next free stage.
+import asyncio
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData import playwright_session_async
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_preprocessor, sequence_order
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.PreprocessData import bybit_highs_lows_15m_batch as highs_lows
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import printer, latency
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.stage_queue import StageQueue
+
+# queue name -> (maxsize, policy)
+QUEUES = {
+    "captured": (1, "latest"),     # only the newest assembled block matters
+    "ordered":  (1, "latest"),     # enrichment busy → newer block replaces the waiting one
+    "enriched": (64, "lossless"),  # every enriched block is printed + broadcast
+}
+
+
+async def order_stage(inq: StageQueue, outq: StageQueue) -> None:
+    while True:
+        block = await inq.get()
+        latency.mark("dequeue", block)
+        await outq.put(sequence_order.order_by_l1_time(block))
+
+
+async def enrich_stage(inq: StageQueue, outq: StageQueue) -> None:
+    while True:
+        block = await inq.get()
+        await outq.put(await bybit_preprocessor.process_async(block))
+
+
+async def emit_stage(inq: StageQueue) -> None:
+    while True:
+        block = await inq.get()
+        printer.print_sequence(block)
+        ws_emit_bridge.send(block)
+
+
+async def main() -> None:
+    q = {name: StageQueue(name, size, policy) for name, (size, policy) in QUEUES.items()}
+
+    ws_emit_bridge.start_server("127.0.0.1", 8765)
+    latency.start_reporter(60)
+    await highs_lows.init_bybit_public_async()  # markets loaded before the first block
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(playwright_session_async.capture_blocks(q["captured"]))
+            tg.create_task(order_stage(q["captured"], q["ordered"]))
+            tg.create_task(enrich_stage(q["ordered"], q["enriched"]))
+            tg.create_task(emit_stage(q["enriched"]))
+    finally:
+        for sq in q.values():
+            print("📊 [PIPELINE]", sq.stats())
+        await highs_lows.close_bybit_public_async()
+        ws_emit_bridge.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
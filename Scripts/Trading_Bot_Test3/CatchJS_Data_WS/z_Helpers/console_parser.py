@@ -0,0 +1,79 @@
+# console_parser.py
+# Fast path for aggr console messages: one find() rejects noise before any decoding,
+# payloads decode with orjson when installed (json otherwise), and one inline schema check
+# validates the dict and hands the block assembler a DivergenceEvent record.
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, NamedTuple, Optional
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+try:  # optional, several times faster decode
+    import orjson as _orjson
+    _loads = _orjson.loads
+except ImportError:
+    _orjson = None
+    _loads = json.loads
+
+PREFIX = "[AGGR INDICATOR]"
+
+DIVERGENCE = "divergence"
+SEQUENCE_END = "sequence_end"  # {"v":1,"source":"aggr/indicator","type":"sequence_end","sequence":N}
+_EMPTY: Dict[str, Any] = {}
+
+
+class ConsoleRecord(NamedTuple):
+    kind: str        # DIVERGENCE | SEQUENCE_END
+    sequence: int
+    event: Optional[DivergenceEvent]  # None for SEQUENCE_END
+
+
+# -------------------- schema --------------------
+# Same contract as utils.is_divergence_event, checked inline (no per-field loop or helper calls).
+def _validate(p: dict) -> Optional[ConsoleRecord]:
+    get = p.get
+    seq = get("sequence")
+    if not isinstance(seq, int):
+        return None
+    if get("type") == SEQUENCE_END:
+        return ConsoleRecord(SEQUENCE_END, seq, None)
+    if (get("v") != 1 or get("source") != "aggr/indicator" or not isinstance(get("thread_id"), str)
+            or not isinstance(get("side"), str) or not isinstance(get("status"), str)):
+        return None
+    l1, l2 = get("L1"), get("L2")
+    if not isinstance(l1, dict) and not isinstance(l2, dict):  # utils.extract_L1_L2 fallback
+        piv = get("pivots")
+        piv = piv if isinstance(piv, dict) else _EMPTY
+        l1, l2 = piv.get("L1"), piv.get("L2")
+    if (l1 and not isinstance(l1, dict)) or (l2 and not isinstance(l2, dict)):
+        return None
+    return ConsoleRecord(DIVERGENCE, seq, DivergenceEvent.from_dict(p))
+
+
+# -------------------- public API --------------------
+def parse(text: str, prefix: str = PREFIX) -> Optional[ConsoleRecord]:
+    """
+    Divergence event or end-of-sequence marker from one console line, else None.
+    Lines without the prefix (most aggr console traffic) cost a single find().
+    """
+    i = text.find(prefix)
+    if i < 0:
+        return None
+    tail = text[i + len(prefix):]
+    if not tail.startswith("{"):
+        tail = tail.lstrip()
+        if not tail.startswith("{"):
+            return None
+    try:
+        payload = _loads(tail)
+    except ValueError:  # json.JSONDecodeError / orjson.JSONDecodeError
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return _validate(payload)
+
+
+def backend() -> str:
+    return "orjson" if _orjson is not None else "json"
@@ -0,0 +1,129 @@
+# divergence_event.py
+# Flat, slotted record for one aggr divergence event as it moves through the producer:
+# console parser → ordering → enrichment → printer/store → hub. Dicts only exist at the
+# edges: from_dict() when a payload enters, to_dict()/to_wire() when it is serialized.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# keys mapped onto fields; anything else rides along in `extra` (meta, tf_label, ticker, …)
+_KNOWN = frozenset(("v", "source", "tf_sec", "side", "status", "thread_id", "pair_id", "sequence",
+                    "L1", "L2", "H1", "cvd", "pivots"))
+_EMPTY: Dict[str, Any] = {}
+
+
+@dataclass(slots=True)
+class DivergenceEvent:
+    thread_id: str
+    sequence: int
+    side: str
+    status: str
+    tf_sec: Optional[int] = None
+    pair_id: Optional[str] = None
+    l1_time: Optional[int] = None    # s (aggr clock)
+    l1_price: Optional[float] = None
+    l2_time: Optional[int] = None
+    l2_price: Optional[float] = None
+    h1_time: Optional[int] = None    # s (Bybit bar open), set by enrichment
+    h1_price: Optional[float] = None
+    cvd_l1: Optional[float] = None
+    cvd_l2: Optional[float] = None
+    v: int = 1
+    source: str = "aggr/indicator"
+    extra: Optional[Dict[str, Any]] = None
+
+    # ---------- dict edges ----------
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "DivergenceEvent":
+        """Build from a console/JSON payload (flat L1/L2 or nested under 'pivots')."""
+        get = d.get
+        l1, l2 = get("L1"), get("L2")
+        if not isinstance(l1, dict) and not isinstance(l2, dict):
+            piv = get("pivots") or {}
+            l1, l2 = piv.get("L1"), piv.get("L2")
+        l1 = l1 if isinstance(l1, dict) else _EMPTY
+        l2 = l2 if isinstance(l2, dict) else _EMPTY
+        h1 = get("H1")
+        h1 = h1 if isinstance(h1, dict) else _EMPTY
+        cvd = get("cvd")
+        cvd = cvd if isinstance(cvd, dict) else _EMPTY
+        extra = {k: v for k, v in d.items() if k not in _KNOWN}
+        return cls(  # positional: noticeably cheaper than 17 keywords on the hot path
+            get("thread_id"), get("sequence"), get("side"), get("status"),
+            get("tf_sec"), get("pair_id"),
+            l1.get("time"), l1.get("price"), l2.get("time"), l2.get("price"),
+            h1.get("time"), h1.get("price"), cvd.get("L1"), cvd.get("L2"),
+            get("v", 1), get("source", "aggr/indicator"), extra or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Wire shape (same keys/order the producer always emitted; H1 right after L2)."""
+        out: Dict[str, Any] = {"v": self.v, "source": self.source}
+        if self.tf_sec is not None:
+            out["tf_sec"] = self.tf_sec
+        out["side"] = self.side
+        out["status"] = self.status
+        out["thread_id"] = self.thread_id
+        if self.pair_id is not None:
+            out["pair_id"] = self.pair_id
+        out["sequence"] = self.sequence
+        if self.l1_time is not None or self.l1_price is not None:
+            out["L1"] = {"time": self.l1_time, "price": self.l1_price}
+        if self.l2_time is not None or self.l2_price is not None:
+            out["L2"] = {"time": self.l2_time, "price": self.l2_price}
+        if self.h1_price is not None:
+            out["H1"] = {"time": self.h1_time, "price": self.h1_price}
+        if self.cvd_l1 is not None or self.cvd_l2 is not None:
+            out["cvd"] = {"L1": self.cvd_l1, "L2": self.cvd_l2}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    # ---------- pipeline helpers ----------
+    @property
+    def key(self) -> Tuple[int, str]:
+        return self.sequence, self.thread_id
+
+    @property
+    def has_pivots(self) -> bool:
+        return self.l1_time is not None and self.l2_time is not None
+
+    @property
+    def is_enriched(self) -> bool:
+        return (isinstance(self.l1_price, (int, float)) and isinstance(self.l2_price, (int, float))
+                and isinstance(self.h1_price, (int, float)) and isinstance(self.h1_time, (int, float)))
+
+    def get_extra(self, key: str, default: Any = None) -> Any:
+        return self.extra.get(key, default) if self.extra else default
+
+    def enriched(self, l1_price: float, l2_price: float, h1_price: float, h1_time: int) -> "DivergenceEvent":
+        """Copy with Bybit L1/L2 lows and the H1 high (extra is shared, never mutated)."""
+        return DivergenceEvent(
+            self.thread_id, self.sequence, self.side, self.status, self.tf_sec, self.pair_id,
+            self.l1_time, l1_price, self.l2_time, l2_price, h1_time, h1_price,
+            self.cvd_l1, self.cvd_l2, self.v, self.source, self.extra,
+        )
+
+
+def to_wire(obj: Any) -> Any:
+    """JSON-ready form of an event, a block of events, or anything already JSON-like."""
+    if isinstance(obj, DivergenceEvent):
+        return obj.to_dict()
+    if isinstance(obj, list):
+        return [o.to_dict() if isinstance(o, DivergenceEvent) else o for o in obj]
+    return obj
+
+
+def from_wire(obj: Any) -> Any:
+    """Inverse of to_wire for receivers: dict → DivergenceEvent, list → list of them."""
+    if isinstance(obj, dict):
+        return DivergenceEvent.from_dict(obj)
+    if isinstance(obj, list):
+        return [DivergenceEvent.from_dict(o) if isinstance(o, dict) else o for o in obj]
+    return obj
+
+
+def events_from_dicts(block: List[Dict[str, Any]]) -> List[DivergenceEvent]:
+    return [DivergenceEvent.from_dict(d) for d in block]
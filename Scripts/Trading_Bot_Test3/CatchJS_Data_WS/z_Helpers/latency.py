@@ -0,0 +1,185 @@
+# latency.py
+# Per-event stage timestamps from console capture to WS send, keyed by (sequence, thread_id).
+# Each stage calls mark(); when an event reaches "send" its hop durations go into histograms.
+#   capture → dequeue → enrich_start → enrich_end → emit_enqueue → send
+# stats() returns p50/p90/p99 per hop; start_reporter() prints one summary line periodically.
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+STAGES = ("capture", "dequeue", "enrich_start", "enrich_end", "emit_enqueue", "send")
+
+# hop name -> (from stage, to stage)
+HOPS: Dict[str, Tuple[str, str]] = {
+    "debounce":  ("capture", "dequeue"),        # console buffer + block debounce
+    "queue":     ("dequeue", "enrich_start"),   # ordering / hand-off to the enrichment worker
+    "enrich":    ("enrich_start", "enrich_end"),  # OHLCV fetch + pivot resolution
+    "post":      ("enrich_end", "emit_enqueue"),  # print / store before send()
+    "broadcast": ("emit_enqueue", "send"),      # hub queue + serialization + fan-out
+    "total":     ("capture", "send"),
+}
+
+MAX_PENDING = 20_000   # events captured but never sent (tail-dropped sequences) are evicted past this
+
+ENABLED = True
+
+_clock = time.perf_counter  # monotonic, sub-ms resolution (time.monotonic is ~15 ms on Windows)
+
+
+# -------------------- histogram --------------------
+class Histogram:
+    """Log-bucketed latency histogram in ms (~19% bucket width, 10 µs … ~170 s)."""
+    _EDGES: List[float] = [0.01 * (2 ** (k / 4)) for k in range(96)]
+
+    __slots__ = ("counts", "n", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(self._EDGES) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(self._EDGES, ms)] += 1
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, pct: float) -> float:
+        """Upper edge of the bucket holding the pct-th sample (capped at the observed max)."""
+        if not self.n:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100.0 * self.n))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                edge = self._EDGES[i] if i < len(self._EDGES) else self.max
+                return min(edge, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "n": self.n,
+            "mean_ms": round(self.total / self.n, 3) if self.n else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+# -------------------- state --------------------
+_lock = threading.Lock()
+_pending: "OrderedDict[Tuple[Any, Any], Dict[str, float]]" = OrderedDict()
+_hist: Dict[str, Histogram] = {h: Histogram() for h in HOPS}
+_counters = {"completed": 0, "evicted": 0}
+
+
+def _key(ev: Any) -> Optional[Tuple[Any, Any]]:
+    if isinstance(ev, DivergenceEvent):
+        return ev.key
+    if isinstance(ev, dict):
+        return ev.get("sequence"), ev.get("thread_id")
+    return None
+
+
+def _complete(stamps: Dict[str, float]) -> None:
+    for hop, (a, b) in HOPS.items():
+        ta, tb = stamps.get(a), stamps.get(b)
+        if ta is not None and tb is not None and tb >= ta:
+            _hist[hop].add((tb - ta) * 1000)
+    _counters["completed"] += 1
+
+
+# -------------------- public API --------------------
+def mark(stage: str, events: Any, ts: Optional[float] = None) -> None:
+    """
+    Stamp `stage` on one event or a block (list); DivergenceEvent or wire dict.
+    The first stamp per stage wins; 'send' finalizes the event into the histograms.
+    """
+    if not ENABLED:
+        return
+    now = _clock() if ts is None else ts
+    items: Iterable[Any] = events if isinstance(events, list) else (events,)
+    with _lock:
+        for ev in items:
+            k = _key(ev)
+            if k is None:
+                continue
+            stamps = _pending.get(k)
+            if stamps is None:
+                if stage != "capture":
+                    continue  # not captured in this process (e.g. replayed) → nothing to measure
+                stamps = _pending[k] = {}
+                if len(_pending) > MAX_PENDING:
+                    _pending.popitem(last=False)
+                    _counters["evicted"] += 1
+            stamps.setdefault(stage, now)
+            if stage == "send":
+                _complete(_pending.pop(k))
+
+
+def stats() -> Dict[str, Any]:
+    """Per-hop latency summary plus completed / pending / evicted counts."""
+    with _lock:
+        out: Dict[str, Any] = {hop: h.summary() for hop, h in _hist.items()}
+        out["completed"] = _counters["completed"]
+        out["pending"] = len(_pending)
+        out["evicted"] = _counters["evicted"]
+    return out
+
+
+def reset() -> None:
+    with _lock:
+        _pending.clear()
+        for hop in HOPS:
+            _hist[hop] = Histogram()
+        _counters["completed"] = _counters["evicted"] = 0
+
+
+def format_line(s: Optional[Dict[str, Any]] = None) -> str:
+    s = s or stats()
+    parts = [f"{hop} {s[hop]['p50_ms']:.1f}/{s[hop]['p99_ms']:.1f}" for hop in HOPS]
+    return "⏱️ [LATENCY] p50/p99 ms | " + " | ".join(parts) + f" | n={s['completed']} pending={s['pending']}"
+
+
+# -------------------- periodic reporter --------------------
+_reporter: Optional[threading.Thread] = None
+_reporter_stop = threading.Event()
+
+
+def start_reporter(interval_s: float = 60.0) -> None:
+    """Print format_line() every `interval_s` seconds (idempotent; skips idle intervals)."""
+    global _reporter
+    if _reporter and _reporter.is_alive():
+        return
+    _reporter_stop.clear()
+
+    def _run():
+        last_n = -1
+        while not _reporter_stop.wait(interval_s):
+            s = stats()
+            if s["completed"] != last_n:
+                last_n = s["completed"]
+                print(format_line(s))
+
+    _reporter = threading.Thread(target=_run, name="latency-report", daemon=True)
+    _reporter.start()
+
+
+def stop_reporter() -> None:
+    global _reporter
+    _reporter_stop.set()
+    if _reporter:
+        _reporter.join(timeout=1)
+    _reporter = None
@@ -2,16 +2,17 @@
 import atexit
 from typing import Any, Iterable, Optional
 from . import utils
+from .divergence_event import DivergenceEvent
 
 
-def _infer_label(events: Iterable[dict]) -> Optional[str]:
+def _infer_label(events: Iterable[DivergenceEvent]) -> Optional[str]:
     """Return 'Bybit' if any event has H1, else infer from 'source', else None."""
     events = list(events)
     if not events:
         return None
-    if any(isinstance(ev.get("H1"), dict) and "price" in ev["H1"] for ev in events):
+    if any(ev.h1_price is not None for ev in events):
         return "Bybit"
-    src = str((events[0] or {}).get("source") or "").lower()
+    src = str(events[0].source or "").lower()
     if "aggr" in src:
         return "Aggr"
     if "bybit" in src:
@@ -27,19 +28,17 @@ class _SeqPrinter:
         self._footer: str = ""
         atexit.register(self._flush)
 
-    def _line_for_event(self, ev: dict) -> str:
-        side = ev.get("side", "?")
+    def _line_for_event(self, ev: DivergenceEvent) -> str:
+        side = ev.side or "?"
         icon = "🟢" if side == "bull" else "🔴" if side == "bear" else "⚪"
-        status = ev.get("status", "?")
-        l1, l2 = utils.extract_L1_L2(ev)
-        base = f"{status} {icon} | {utils.fmt_price(l1.get('price'))}-{utils.fmt_price(l2.get('price'))}"
-        h1 = ev.get("H1")
-        if isinstance(h1, dict) and "price" in h1:
-            base += f" | H1 {utils.fmt_price(h1.get('price'))}"
+        status = ev.status or "?"
+        base = f"{status} {icon} | {utils.fmt_price(ev.l1_price)}-{utils.fmt_price(ev.l2_price)}"
+        if ev.h1_price is not None:
+            base += f" | H1 {utils.fmt_price(ev.h1_price)}"
         return base
 
-    def _open_box(self, events: list[dict]) -> None:
-        seq = events[0].get("sequence")
+    def _open_box(self, events: list[DivergenceEvent]) -> None:
+        seq = events[0].sequence
         tf = utils.choose_tf_label(events)
         label = _infer_label(events)
         top, bottom = utils.seq_bars(seq, tf, label)
@@ -54,7 +53,7 @@ class _SeqPrinter:
         self._footer = ""
 
     def print_event(self, data: Any) -> None:
-        """Accept a single dict or a list[dict] and print properly."""
+        """Accept a single event or a list of events and print properly."""
         if isinstance(data, list):
             if not data:
                 return
@@ -64,7 +63,7 @@ class _SeqPrinter:
             self._close_box()
         else:
             ev = data
-            seq = ev.get("sequence")
+            seq = ev.sequence
             if seq != self._seq_id:
                 self._open_box([ev])
             print(self._line_for_event(ev))
@@ -76,5 +75,5 @@ class _SeqPrinter:
 _prn = _SeqPrinter()
 
 def print_sequence(data: Any) -> None:
-    """Public API: print a single event or a full block (list[dict])."""
+    """Public API: print a single event or a full block (list[DivergenceEvent])."""
     _prn.print_event(data)
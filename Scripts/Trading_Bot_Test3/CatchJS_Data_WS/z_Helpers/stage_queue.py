@@ -0,0 +1,78 @@
+# stage_queue.py
+# Bounded asyncio hand-off between producer pipeline stages with an explicit overflow policy:
+#   "latest"   → put never waits; when full the oldest item is dropped (newest block wins)
+#   "lossless" → put waits for space, so a slow stage back-pressures the one before it
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict
+
+POLICIES = ("latest", "lossless")
+
+
+class StageQueue:
+    """
+    Single-loop queue (not thread-safe; all stages run on one event loop).
+      - put(item)        : awaitable, honours the policy
+      - put_nowait(item) : for sync callbacks; lossless + full → item is dropped and counted
+      - get()            : awaitable, FIFO
+    """
+
+    def __init__(self, name: str, maxsize: int = 1, policy: str = "latest"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items: Deque[Any] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self.counters: Dict[str, int] = {"put": 0, "got": 0, "dropped": 0, "max_depth": 0}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _append(self, item: Any) -> None:
+        self._items.append(item)
+        self.counters["put"] += 1
+        if len(self._items) > self.counters["max_depth"]:
+            self.counters["max_depth"] = len(self._items)
+        self._not_empty.set()
+        if len(self._items) >= self.maxsize:
+            self._not_full.clear()
+
+    def put_nowait(self, item: Any) -> bool:
+        """Enqueue without waiting. Returns False if the item (lossless, full) was dropped."""
+        if len(self._items) >= self.maxsize:
+            if self.policy == "lossless":
+                self.counters["dropped"] += 1
+                return False
+            self._items.popleft()
+            self.counters["dropped"] += 1
+        self._append(item)
+        return True
+
+    async def put(self, item: Any) -> None:
+        if self.policy == "lossless":
+            while len(self._items) >= self.maxsize:
+                await self._not_full.wait()
+        self.put_nowait(item)
+
+    async def get(self) -> Any:
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item = self._items.popleft()
+        self.counters["got"] += 1
+        if not self._items:
+            self._not_empty.clear()
+        self._not_full.set()
+        return item
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "policy": self.policy, "depth": len(self._items), **self.counters}
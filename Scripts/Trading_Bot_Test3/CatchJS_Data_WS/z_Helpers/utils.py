@@ -53,11 +53,12 @@ def to_bold_unicode(s: str) -> str:
         else: out.append(ch)
     return "".join(out)
 
-def choose_tf_label(batch: list[dict]) -> str:
+def choose_tf_label(batch: list) -> str:
+    """batch: list[DivergenceEvent]."""
     for ev in reversed(batch):
-        lbl = ev.get("tf_label")
+        lbl = ev.get_extra("tf_label")
         if lbl: return lbl
-        sec = ev.get("tf_sec")
+        sec = ev.tf_sec
         if sec: return fmt_tf(sec)
     return "?"
 
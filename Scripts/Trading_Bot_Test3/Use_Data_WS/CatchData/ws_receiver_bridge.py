@@ -0,0 +1,436 @@
+# ws_receiver_bridge.py — receiver CLIENT for any number of hubs on ONE event loop / thread
+# Each hub URI gets an _Endpoint (its own backoff, logging and negotiated wire codec, no module
+# globals); every decoded object lands in one merged consumer queue, in arrival order, with
+# per-hub sequence order enforced. Replaces the per-port ws_receiver_bridge_87xx copies.
+# ACKs are cumulative ({"type": "ack", "seq", "n"}): one per received frame, or one per time
+# window; ack="object" keeps the old one-reply-per-object behaviour for older hubs.
+# Each endpoint remembers the last hub message id it processed and reconnects with ?resume=<id>,
+# so the hub replays what was broadcast while it was away (duplicates are skipped by id). A fresh
+# endpoint gets the hub's latest-state snapshot first, delivered like any other objects.
+# Ids only hold within one hub run: the resume URI also carries the hub's epoch, and a different
+# epoch on the replay/snapshot/hello (the hub restarted) resets the resume point and ordering state.
+# Delta frames (only the threads that changed since the symbol's previous block) are rebuilt into
+# the full block before delivery, so consumers always see whole blocks.
+import asyncio
+import json
+import threading
+from contextlib import suppress
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import websockets
+from websockets import ConnectionClosedOK, ConnectionClosedError
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.log_uniform import UniformLogger
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.block_delta import BlockState
+
+DEFAULT_URIS = ("ws://127.0.0.1:8765",)
+CONNECT_KW = dict(ping_interval=20, ping_timeout=20, close_timeout=1, max_size=None)
+
+ACK_BATCH = "batch"     # one cumulative ACK per received frame
+ACK_WINDOW = "window"   # one cumulative ACK per ack_window_ms (if anything arrived)
+ACK_OBJECT = "object"   # legacy: one reply per object
+ACK_MODES = (ACK_BATCH, ACK_WINDOW, ACK_OBJECT)
+
+
+class Received(NamedTuple):
+    source: str          # hub URI
+    seq: Optional[int]   # aggr sequence (None if the object has none)
+    order: int           # arrival number across all hubs (strictly increasing)
+    payload: dict        # one wire dict (arrays are split into their objects)
+
+
+OnMessage = Callable[[Received], Union[None, Awaitable[None]]]
+
+# === Helpers ==============================================================
+
+def _maybe_pivots(d: dict) -> dict:
+    """Accept both flat keys and nested under 'pivots'."""
+    piv = d.get("pivots")
+    return piv if isinstance(piv, dict) else d
+
+def summarize_bridge_payload(d: dict) -> str:
+    piv = _maybe_pivots(d)
+    L1 = piv.get("L1"); T1 = d.get("T1")
+    L2 = piv.get("L2"); T2 = d.get("T2")
+    L3 = piv.get("L3"); T3 = d.get("T3")
+    L4 = piv.get("L4"); T4 = d.get("T4")
+    SL = d.get("SL")
+    tradable = d.get("Tradable")
+    return (f"L1={L1} T1={T1} | L2={L2} T2={T2} | "
+            f"L3={L3} T3={T3} | L4={L4} T4={T4} | SL={SL} | Tradable={tradable}")
+
+def _with_resume(uri: str, last_id: Optional[int], epoch: Optional[str] = None) -> str:
+    if last_id is None:
+        return uri
+    parts = urlsplit(uri)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in ("resume", "epoch")] + [("resume", str(last_id))]
+    if epoch:
+        query.append(("epoch", epoch))
+    return urlunsplit(parts._replace(path=parts.path or "/", query=urlencode(query)))
+
+def _port_of(uri: str) -> str:
+    tail = uri.rsplit(":", 1)[-1]
+    return tail.split("/", 1)[0] if tail[:1].isdigit() else uri
+
+
+# === Per-connection state =================================================
+
+class _Endpoint:
+    """One hub connection: retry/backoff, logging toggles and counters live here, not in globals."""
+
+    def __init__(self, rx: "MultiReceiver", uri: str):
+        self.rx = rx
+        self.uri = uri
+        self.log = UniformLogger(f"WS-RECV:{_port_of(uri)}", show_wire=False, show_raw=False)
+        self.codec = wire_codec.get(wire_codec.JSON)
+        self.connected = False
+        self.last_seq: Optional[int] = None
+        self.received = 0
+        self.stale = 0          # objects whose sequence went backwards (dropped)
+        self.reconnects = 0
+        self.acks_sent = 0
+        self.last_id: Optional[int] = None   # last hub message id processed (resume point)
+        self.epoch: Optional[str] = None     # hub run last_id belongs to
+        self.hub_restarts = 0   # epoch changes seen (ids and sequences started over)
+        self.duplicates = 0     # frames skipped because their id was already processed
+        self.missed = 0         # ids the hub never delivered (its slow-consumer policy / replay gap)
+        self.gaps = 0           # resumes where the hub no longer had every missed frame
+        self.snapshots = 0
+        self.blocks = BlockState()  # last full block per symbol, the base deltas apply to
+        self.deltas = 0
+        self.resyncs = 0        # deltas whose base this endpoint lacked (state dropped, reconnected fresh)
+        self._ack_n = 0                   # records processed since the last ACK
+        self._ack_seq: Optional[int] = None
+
+    def _log(self, method: str, *args):
+        if self.rx.logs_enabled:
+            getattr(self.log, method)(*args)
+
+    def _log_sent_json(self, payload):
+        if self.rx.log_wire:
+            self.log.sent_json(payload if isinstance(payload, str) else json.dumps(payload))
+
+    async def _send_ack(self, ws, ack: dict) -> None:
+        await ws.send(self.codec.encode(ack))
+        self.acks_sent += 1
+        self._log_sent_json(ack)
+
+    async def _flush_ack(self, ws) -> None:
+        if self._ack_n:
+            ack = wire_codec.ack(self._ack_seq, self._ack_n, self.last_id)
+            self._ack_n = 0
+            await self._send_ack(ws, ack)
+
+    async def _ack_ticker(self, ws) -> None:
+        while True:
+            await asyncio.sleep(self.rx.ack_window_s)
+            await self._flush_ack(ws)
+
+    async def _handle(self, ws, obj: dict) -> None:
+        side = obj.get("side", "-")
+        tf = obj.get("tf_sec", "-")
+        status = obj.get("status", "-")
+        self._log("recv_summary", side, str(tf), status)
+        if self.rx.logs_enabled:
+            print(f"    → {summarize_bridge_payload(obj)}")
+
+        seq = obj.get("sequence")
+        seq = seq if isinstance(seq, int) else None
+        if self.rx.ack_mode == ACK_OBJECT:
+            await self._send_ack(ws, {
+                "ok": True, "message": "receiver ack",
+                "tradable": bool(obj.get("Tradable", False)),
+                "sl": obj.get("SL")
+            })
+        else:
+            self._ack_n += 1
+            if seq is not None and (self._ack_seq is None or seq > self._ack_seq):
+                self._ack_seq = seq
+
+        if seq is not None and self.last_seq is not None and seq < self.last_seq:
+            self.stale += 1
+            return
+        if seq is not None:
+            self.last_seq = seq
+        self.received += 1
+        self.rx._deliver(Received(self.uri, seq, next(self.rx._order), obj))
+
+    def _on_epoch(self, epoch: Optional[str]) -> None:
+        """Hub run announced on connect; a new one means our ids / sequences belong to the old run."""
+        if not epoch or epoch == self.epoch:
+            return
+        if self.epoch is not None:
+            self.hub_restarts += 1
+            self.last_id = None
+            self.last_seq = None
+            self._ack_seq = None
+            self.blocks.clear()
+        self.epoch = epoch
+
+    async def _recv_loop(self, ws) -> None:
+        async for msg in ws:
+            try:
+                payload = self.codec.decode(msg)
+            except Exception:
+                if self.rx.logs_enabled:
+                    print(f"📥 [{self.log.role}] Raw: {msg!r}")
+                continue
+
+            if isinstance(payload, dict) and payload.get("type") in (wire_codec.HELLO, wire_codec.REPLAY,
+                                                                     wire_codec.SNAPSHOT):
+                self._on_epoch(payload.get("epoch"))
+            if isinstance(payload, dict) and payload.get("type") == wire_codec.REPLAY:
+                self._log("replay", len(payload.get("frames") or ()), bool(payload.get("gap")))
+                if payload.get("gap"):
+                    self.gaps += 1
+            elif isinstance(payload, dict) and payload.get("type") == wire_codec.SNAPSHOT:
+                states = payload.get("states") or ()
+                self._log("snapshot", len(states), sum(len(st.get("events") or ()) for st in states))
+                self.snapshots += 1
+
+            for msg_id, data in wire_codec.unwrap(payload):
+                if msg_id is not None and self.last_id is not None:
+                    if msg_id <= self.last_id:
+                        self.duplicates += 1
+                        continue
+                    self.missed += msg_id - self.last_id - 1
+                if isinstance(data, dict) and data.get("type") == wire_codec.DELTA:
+                    data = self.blocks.apply(data)
+                    if data is None:  # out of step with the hub: start over from its snapshot
+                        self.resyncs += 1
+                        self.last_id = None
+                        self.blocks.clear()
+                        await ws.close(1000, "delta base missing")
+                        return
+                    self.deltas += 1
+                elif msg_id is not None and payload.get("type") != wire_codec.SNAPSHOT:
+                    self.blocks.load(msg_id, data)  # snapshots aren't in block order: never a delta base
+                if isinstance(data, dict):
+                    await self._handle(ws, data)
+                elif isinstance(data, list):
+                    for obj in data:
+                        if isinstance(obj, dict):
+                            await self._handle(ws, obj)
+                elif self.rx.logs_enabled:
+                    print(f"📥 [{self.log.role}] Unsupported shape: {type(data)}")
+                if msg_id is not None:
+                    self.last_id = msg_id
+
+            if self.rx.ack_mode == ACK_BATCH:
+                await self._flush_ack(ws)
+
+    async def run(self) -> None:
+        self._log("starting")
+        backoff = 1
+        waiting_logged = False            # print "Waiting ..." once per offline stretch
+        had_connected = False             # true after first successful connect
+        disc_logged_this_offline = False  # single "Disconnected ..." per offline stretch
+
+        while not self.rx.stopping:
+            try:
+                if not waiting_logged:
+                    self._log("waiting")
+                    waiting_logged = True
+
+                uri = _with_resume(self.uri, self.last_id, self.epoch)
+                async with websockets.connect(uri, subprotocols=wire_codec.subprotocols(), **CONNECT_KW) as ws:
+                    # online
+                    self.codec = wire_codec.from_subprotocol(ws.subprotocol)
+                    self.connected = True
+                    if had_connected:
+                        self.reconnects += 1
+                    backoff = 1
+                    waiting_logged = False
+                    disc_logged_this_offline = False
+                    had_connected = True
+                    self._log("connected")
+                    self._log("ready")
+                    if self.rx.logs_enabled:
+                        print(f"    wire={self.codec.name}\n")
+                    self._ack_n = 0
+                    ticker = asyncio.create_task(self._ack_ticker(ws)) if self.rx.ack_mode == ACK_WINDOW else None
+                    try:
+                        await self._recv_loop(ws)
+                    finally:
+                        if ticker is not None:
+                            ticker.cancel()
+
+            except (ConnectionClosedOK, ConnectionClosedError) as e:
+                if had_connected and not disc_logged_this_offline:
+                    self._log("disconnected", e.code, e.reason)
+                    disc_logged_this_offline = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # OSError (hub down) and anything else: retry
+                if had_connected and not disc_logged_this_offline:
+                    self._log("disconnected", "?", str(e))
+                    disc_logged_this_offline = True
+            finally:
+                self.connected = False
+
+            # offline; print "Waiting ..." once per stretch
+            if self.rx.stopping:
+                break
+            if not waiting_logged:
+                self._log("waiting")
+                waiting_logged = True
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "wire": self.codec.name,
+            "received": self.received,
+            "stale": self.stale,
+            "last_seq": self.last_seq,
+            "reconnects": self.reconnects,
+            "acks_sent": self.acks_sent,
+            "last_id": self.last_id,
+            "epoch": self.epoch,
+            "hub_restarts": self.hub_restarts,
+            "duplicates": self.duplicates,
+            "missed": self.missed,
+            "gaps": self.gaps,
+            "snapshots": self.snapshots,
+            "deltas": self.deltas,
+            "resyncs": self.resyncs,
+        }
+
+
+# === Receiver =============================================================
+
+class MultiReceiver:
+    """
+    Connects to every hub URI from the current event loop and merges their streams.
+    Consume with `async for msg in rx.messages()` or pass `on_message` to run().
+    The merged queue is bounded; when nobody keeps up, the oldest entry is dropped (counted).
+    """
+
+    def __init__(self, uris: Iterable[str] = DEFAULT_URIS, *, noisylogs: bool = False, logs: bool = False,
+                 queue_size: int = 10_000, ack: str = ACK_BATCH, ack_window_ms: int = 250):
+        # noisylogs → everything (incl. 'Sent back (json)'); logs → all but that; both False → silent
+        if ack not in ACK_MODES:
+            raise ValueError(f"unknown ack mode {ack!r} (expected one of {ACK_MODES})")
+        self.ack_mode = ack
+        self.ack_window_s = max(ack_window_ms, 1) / 1000.0
+        self.logs_enabled = bool(noisylogs or logs)
+        self.log_wire = bool(noisylogs)
+        self.endpoints: List[_Endpoint] = [_Endpoint(self, u) for u in dict.fromkeys(uris)]
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.stopping = False
+        self._order = count(1)
+        self._wake: Optional[asyncio.Event] = None
+
+    def _deliver(self, msg: Received) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(msg)
+
+    async def messages(self):
+        while True:
+            yield await self.queue.get()
+
+    async def _consume(self, on_message: OnMessage) -> None:
+        async for msg in self.messages():
+            res = on_message(msg)
+            if asyncio.iscoroutine(res):
+                await res
+
+    async def run(self, on_message: Optional[OnMessage] = None) -> None:
+        self._wake = asyncio.Event()
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(ep.run(), name=f"ws-recv-{ep.uri}") for ep in self.endpoints]
+            if on_message is not None:
+                tasks.append(tg.create_task(self._consume(on_message), name="ws-recv-consumer"))
+            await self._wake.wait()
+            for t in tasks:  # endpoints may be parked in recv() or a backoff sleep
+                t.cancel()
+
+    def stop(self) -> None:
+        """Loop-thread only; from another thread use loop.call_soon_threadsafe(rx.stop)."""
+        self.stopping = True
+        if self._wake is not None:
+            self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "endpoints": {ep.uri: ep.stats() for ep in self.endpoints},
+        }
+
+
+# === Awaitable / threaded API for main.py ==================================
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_receiver: Optional[MultiReceiver] = None
+
+async def run(uris: Union[str, Iterable[str]] = DEFAULT_URIS, *, noisylogs: bool = False, logs: bool = False,
+              on_message: Optional[OnMessage] = None, ack: str = ACK_BATCH, ack_window_ms: int = 250):
+    """
+    Standalone entry (awaitable): one receiver for all `uris` on the running loop.
+    noisylogs=True  -> print EVERYTHING (incl. 'Sent back (json)')
+    logs=True       -> print all EXCEPT 'Sent back (json)'
+    both False      -> silent
+    ack: 'batch' (one cumulative ACK per frame) | 'window' (per ack_window_ms) | 'object' (legacy)
+    """
+    global _receiver
+    _receiver = MultiReceiver([uris] if isinstance(uris, str) else uris, noisylogs=noisylogs, logs=logs,
+                              ack=ack, ack_window_ms=ack_window_ms)
+    try:
+        await _receiver.run(on_message)
+    except asyncio.CancelledError:
+        _receiver.stop()
+        raise
+
+def start_client(uris: Union[str, Iterable[str]] = DEFAULT_URIS, *, noisylogs: bool = False, logs: bool = False,
+                 on_message: Optional[OnMessage] = None, ack: str = ACK_BATCH, ack_window_ms: int = 250):
+    """Start one background thread / loop serving every URI (idempotent). on_message runs on that loop."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+
+    def _thread_target():
+        global _loop
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        try:
+            _loop.run_until_complete(run(uris, noisylogs=noisylogs, logs=logs, on_message=on_message,
+                                         ack=ack, ack_window_ms=ack_window_ms))
+        finally:
+            _loop.run_until_complete(_loop.shutdown_asyncgens())
+            _loop.close()
+
+    _thread = threading.Thread(target=_thread_target, name="ws-recv", daemon=True)
+    _thread.start()
+
+def stop_client():
+    """Stop the background receiver gracefully (idempotent)."""
+    global _thread
+    if not _thread:
+        return
+    if _loop and _loop.is_running() and _receiver is not None:
+        with suppress(RuntimeError):
+            _loop.call_soon_threadsafe(_receiver.stop)
+    _thread.join(timeout=3)
+    _thread = None
+
+def stats() -> Dict[str, Any]:
+    return _receiver.stats() if _receiver is not None else {}
+
+# === CLI / standalone ======================================================
+if __name__ == "__main__":
+    import sys
+    try:
+        asyncio.run(run(sys.argv[1:] or DEFAULT_URIS, noisylogs=True, logs=True))
+    except KeyboardInterrupt:
+        print("👋 [WS-RECV] Closing by user request.")
+        print("\n🟥 [WS-RECV] Stopped by user.")
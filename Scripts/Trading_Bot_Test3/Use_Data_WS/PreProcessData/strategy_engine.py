@@ -1,6 +1,7 @@
 ﻿from dataclasses import dataclass
-from typing import Dict, Optional
-from . import utils
+from typing import Dict, Optional, Union
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers import utils
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
 
 @dataclass(frozen=True)
 class EngineConfig:
@@ -9,7 +10,7 @@ class EngineConfig:
 class StrategyEngine:
     def __init__(self, cfg: EngineConfig = EngineConfig()):
         self.cfg = cfg
-        self._l2_index: Dict[int, dict] = {}
+        self._l2_index: Dict[int, DivergenceEvent] = {}
         self._printed: set[str] = set()
 
     @staticmethod
@@ -19,35 +20,34 @@ class StrategyEngine:
         except Exception:
             return None
 
-    def _store_prior_bull_l2(self, ev: dict):
-        if ev.get("side") != "bull":
+    def _store_prior_bull_l2(self, ev: DivergenceEvent):
+        if ev.side != "bull":
             return
-        if ev.get("status") not in ("✅", "❔"):
+        if ev.status not in ("✅", "❔"):
             return
-        _l1, l2 = utils.extract_L1_L2(ev)
-        t = self._safe_int(l2.get("time"))
+        t = self._safe_int(ev.l2_time)
         if t is not None:
             self._l2_index[t] = ev
 
-    def _match_prev_l2_with_curr_l1(self, curr: dict):
-        if curr.get("side") != "bull" or curr.get("status") != "❔":
+    def _match_prev_l2_with_curr_l1(self, curr: DivergenceEvent):
+        if curr.side != "bull" or curr.status != "❔":
             return None
-        l1, _ = utils.extract_L1_L2(curr)
-        return self._l2_index.get(self._safe_int(l1.get("time")))
+        return self._l2_index.get(self._safe_int(curr.l1_time))
 
-    def on_event(self, ev: dict):
+    def on_event(self, ev: Union[DivergenceEvent, dict]):
+        """Accepts a DivergenceEvent, or a wire dict straight from the hub."""
+        if isinstance(ev, dict):
+            ev = DivergenceEvent.from_dict(ev)
         prev = self._match_prev_l2_with_curr_l1(ev)
         if prev:
-            entry_key = f"{prev.get('thread_id')}->{ev.get('thread_id')}"
+            entry_key = f"{prev.thread_id}->{ev.thread_id}"
             if entry_key not in self._printed:
                 self._printed.add(entry_key)
                 self._print_entry(prev, ev)
         self._store_prior_bull_l2(ev)
 
-    def _print_entry(self, prev: dict, curr: dict):
-        curr_l1, _ = utils.extract_L1_L2(curr)
-        _prev_l1, prev_l2 = utils.extract_L1_L2(prev)
+    def _print_entry(self, prev: DivergenceEvent, curr: DivergenceEvent):
         print("\n🟢📣 ENTRY SIGNAL (Bull)")
-        print(f"   ├─ Prev Thread: {prev.get('thread_id')}")
-        print(f"   ├─ Curr Thread: {curr.get('thread_id')}")
-        print(f"   ├─ L2(prev) == L1(curr): time={prev_l2.get('time')}  price={utils.fmt_price(prev_l2.get('price'))}")
+        print(f"   ├─ Prev Thread: {prev.thread_id}")
+        print(f"   ├─ Curr Thread: {curr.thread_id}")
+        print(f"   ├─ L2(prev) == L1(curr): time={prev.l2_time}  price={utils.fmt_price(prev.l2_price)}")
@@ -1,6 +1,8 @@
 # main.py
 import asyncio
-from Scripts.Trading_Bot_Test3.Use_Data_WS.CatchData import ws_receiver_bridge_8765 as recv
+from Scripts.Trading_Bot_Test3.Use_Data_WS.CatchData import ws_receiver_bridge as recv
+
+HUB_URIS = ("ws://127.0.0.1:8765", "ws://127.0.0.1:8775", "ws://127.0.0.1:8776")
 
 if __name__ == "__main__":
-    asyncio.run(recv.run("ws://127.0.0.1:8765", noisylogs=False, logs=True))
+    asyncio.run(recv.run(HUB_URIS, noisylogs=False, logs=True))
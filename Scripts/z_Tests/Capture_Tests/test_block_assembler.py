@@ -0,0 +1,67 @@
+# test_block_assembler.py
+# Console events → blocks (CatchData/block_assembler.py): latest sequence wins, stragglers of a finished
+# block are dropped, and a sequence counter that starts over (page reload / indicator restart) is followed.
+# Run from the repo root:  python -m Scripts.z_Tests.Capture_Tests.test_block_assembler   (or: python -m pytest Scripts/z_Tests/Capture_Tests)
+import time
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.CatchData.block_assembler import BlockAssembler
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+DEBOUNCE_S = 0.02
+
+
+def _ev(seq, tid="t0"):
+    return DivergenceEvent(tid, seq, "bull", "ok")
+
+
+def _feed(asm, seqs, per_seq=2):
+    for seq in seqs:
+        for i in range(per_seq):
+            asm.add(_ev(seq, f"t{i}"))
+
+
+def _flush(asm):
+    time.sleep(DEBOUNCE_S * 1.5)
+    asm.flush_due(time.monotonic())
+    return [ev.sequence for ev in asm.ready.popleft()] if asm.ready else None
+
+
+def test_latest_sequence_wins():
+    asm = BlockAssembler(DEBOUNCE_S)
+    _feed(asm, (5, 6, 7))
+    assert _flush(asm) == [7, 7]
+
+
+def test_end_marker():
+    asm = BlockAssembler(DEBOUNCE_S)
+    _feed(asm, (3,))
+    asm.end(3)
+    assert [ev.sequence for ev in asm.ready.popleft()] == [3, 3]
+    assert not asm.pending
+
+
+def test_stragglers_dropped():
+    asm = BlockAssembler(DEBOUNCE_S)
+    _feed(asm, (5, 6, 7))
+    asm.end(7)
+    asm.ready.popleft()
+    _feed(asm, (6, 7))   # right after the block: late events of old sequences
+    assert not asm.pending and not asm.ready
+
+
+def test_sequence_reset():
+    asm = BlockAssembler(DEBOUNCE_S)
+    _feed(asm, (5, 6, 7))
+    assert _flush(asm) == [7, 7]
+    time.sleep(DEBOUNCE_S * 1.5)
+    _feed(asm, (1, 2))   # counter started over
+    assert _flush(asm) == [2, 2]
+    _feed(asm, (3,))     # and keeps going from there
+    assert _flush(asm) == [3, 3]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print("ok  ", name)
@@ -0,0 +1,99 @@
+# test_block_delta.py
+# Hub → receiver reconstruction through the delta path (SendData/block_delta.py): BlockDiff on the hub,
+# wire_codec encode/decode, BlockState on the receiver. Every rebuilt block must equal what a full
+# frame would have delivered, in the same record order, including blocks whose symbols interleave.
+# Run from the repo root:  python -m Scripts.z_Tests.Wire_Tests.test_block_delta   (or: python -m pytest Scripts/z_Tests/Wire_Tests)
+import json
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec as wc
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.block_delta import BlockDiff, BlockState
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent, to_wire
+
+
+def _ev(tid, symbol, seq, price=100.0):
+    return DivergenceEvent(tid, seq, "bull", "✅", tf_sec=900, l1_time=1_700_000_000, l1_price=price,
+                           l2_time=1_700_009_000, l2_price=price + 5, extra={"ticker": symbol})
+
+
+def _block(spec, seq, prices=None):
+    """spec: (thread_id, symbol) pairs in block order."""
+    prices = prices or {}
+    return [_ev(tid, sym, seq, prices.get(tid, 100.0)) for tid, sym in spec]
+
+
+def _ref(obj):
+    return json.loads(json.dumps(to_wire(obj)))
+
+
+def _stream(blocks, codec_name):
+    """Send each (block, seq) hub → receiver; returns (kind, rebuilt block) per block."""
+    codec = wc.get(codec_name)
+    diff, state = BlockDiff(), BlockState()
+    out = []
+    for msg_id, (block, seq) in enumerate(blocks, 1):
+        d = diff.update(block, msg_id, seq)
+        if d.parts is None:
+            ((rid, data),) = wc.unwrap(codec.decode(codec.encode_frame(msg_id, block)))
+            state.load(rid, data)
+            out.append(("full", data))
+        else:
+            msg = codec.decode(codec.encode(wc.delta(msg_id, seq, d.parts, d.order)))
+            ((_rid, msg),) = wc.unwrap(msg)
+            out.append(("delta", state.apply(msg)))
+    return out
+
+
+def _check(blocks, expect_delta=True):
+    for name in (n for n in wc.available() if n != wc.LEGACY):
+        got = _stream(blocks, name)
+        for (kind, data), (block, _seq) in zip(got, blocks):
+            assert data == _ref(block), (name, kind, [d["thread_id"] for d in data or ()])
+        if expect_delta:
+            assert any(kind == "delta" for kind, _ in got[1:]), name
+
+
+# -------------------- interleaved symbols --------------------
+def test_interleaved_unchanged():
+    spec = [("a", "BTCUSDT"), ("x", "ETHUSDT"), ("b", "BTCUSDT"), ("y", "ETHUSDT")]
+    _check([(_block(spec, 2), 2), (_block(spec, 3), 3), (_block(spec, 4), 4)])
+
+
+def test_interleaved_changes():
+    s1 = [("a", "BTCUSDT"), ("x", "ETHUSDT"), ("b", "BTCUSDT"), ("y", "ETHUSDT"), ("c", "BTCUSDT")]
+    s2 = [("x", "ETHUSDT"), ("a", "BTCUSDT"), ("z", "ETHUSDT"), ("b", "BTCUSDT"), ("y", "ETHUSDT")]  # c gone, z new
+    s3 = [("b", "BTCUSDT"), ("x", "ETHUSDT"), ("a", "BTCUSDT"), ("z", "ETHUSDT"), ("y", "ETHUSDT")]
+    _check([(_block(s1, 1), 1), (_block(s2, 2, {"a": 101.0}), 2), (_block(s3, 3), 3),
+            (_block(s1, 4), 4)])
+
+
+def test_grouped_block_sends_no_order():
+    spec = [("a", "BTCUSDT"), ("b", "BTCUSDT"), ("x", "ETHUSDT"), ("y", "ETHUSDT")]
+    diff = BlockDiff()
+    diff.update(_block(spec, 1), 1, 1)
+    d = diff.update(_block(spec, 2), 2, 2)
+    assert d.parts is not None and d.order is None
+    assert "order" not in wc.delta(2, 2, d.parts, d.order)
+    _check([(_block(spec, 1), 1), (_block(spec, 2), 2)])
+
+
+def test_interleaved_order_is_sent():
+    spec = [("a", "BTCUSDT"), ("x", "ETHUSDT"), ("b", "BTCUSDT")]
+    diff = BlockDiff()
+    diff.update(_block(spec, 1), 1, 1)
+    d = diff.update(_block(spec, 2), 2, 2)
+    assert d.order == [("BTCUSDT", "a"), ("ETHUSDT", "x"), ("BTCUSDT", "b")]
+
+
+def test_missing_base():
+    spec = [("a", "BTCUSDT"), ("x", "ETHUSDT")]
+    diff = BlockDiff()
+    diff.update(_block(spec, 1), 1, 1)
+    d = diff.update(_block(spec, 2), 2, 2)
+    assert BlockState().apply(_ref(wc.delta(2, 2, d.parts, d.order))) is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print("ok  ", name)
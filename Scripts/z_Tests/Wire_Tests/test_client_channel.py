@@ -0,0 +1,45 @@
+# test_client_channel.py
+# Slow-consumer policies of the hub's per-client queue (SendData/client_channel.py), checked on the
+# queue alone: offer() never awaits, so no socket or event loop is needed.
+# Run from the repo root:  python -m Scripts.z_Tests.Wire_Tests.test_client_channel   (or: python -m pytest Scripts/z_Tests/Wire_Tests)
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData.client_channel import (
+    COALESCE, DROP_OLDEST, ClientChannel, Frame,
+)
+
+
+def _frame(msg_id, seq, *, catch_up=False):
+    return Frame(msg_id, {"json": f"m{msg_id}"}, seq, [], catch_up=catch_up)
+
+
+def _queued(ch):
+    return [f.id for f in ch._frames]
+
+
+def test_coalesce_replaces_older_live_frames():
+    ch = ClientChannel("C1", None, policy=COALESCE)
+    for i, seq in enumerate((1, 2, 2, 3), 1):
+        ch.offer(_frame(i, seq))
+    assert _queued(ch) == [4] and ch.dropped == 3
+
+
+def test_coalesce_keeps_catch_up():
+    ch = ClientChannel("C1", None, policy=COALESCE)
+    ch.offer(_frame(None, None, catch_up=True))   # hello
+    ch.offer(_frame(7, 5, catch_up=True))         # snapshot as of seq 5
+    ch.offer(_frame(8, 6))
+    ch.offer(_frame(9, 7))
+    assert _queued(ch) == [None, 7, 9] and ch.dropped == 1
+
+
+def test_drop_oldest():
+    ch = ClientChannel("C1", None, policy=DROP_OLDEST, maxsize=2)
+    for i in range(1, 5):
+        ch.offer(_frame(i, i))
+    assert _queued(ch) == [3, 4] and ch.dropped == 2
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print("ok  ", name)
@@ -0,0 +1,85 @@
+# test_hub_restart.py
+# A hub restart starts its message ids over. The receiver must notice (hub epoch), drop its old resume
+# point and deliver the new run's frames instead of skipping them as duplicates of the old run.
+# Each hub run is a real subprocess on the same port; the receiver runs in this process.
+# Run from the repo root:  python -m Scripts.z_Tests.Wire_Tests.test_hub_restart   (or: python -m pytest Scripts/z_Tests/Wire_Tests)
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from Scripts.Trading_Bot_Test3.Use_Data_WS.CatchData import ws_receiver_bridge as recv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# argv: port, first sequence, blocks; waits for a client, sends, waits for its ACKs, exits
+HUB = r"""
+import sys, time
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import ws_emit_bridge as hub
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import DivergenceEvent
+
+port, first, n = map(int, sys.argv[1:4])
+hub.start_server("127.0.0.1", port)
+deadline = time.time() + 20
+while not hub.stats()["clients"] and time.time() < deadline:
+    time.sleep(0.05)
+for seq in range(first, first + n):
+    hub.send([DivergenceEvent(f"t{i}", seq, "bull", "ok", tf_sec=900, l1_time=1_700_000_000,
+                              l1_price=100.0 + seq + i, extra={"ticker": "BTCUSDT"}) for i in range(3)])
+    time.sleep(0.01)
+while time.time() < deadline:
+    st = hub.stats()
+    if st["clients"] and all(c["acked_id"] == st["last_id"] for c in st["clients"].values()):
+        break
+    time.sleep(0.05)
+hub.stop()
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _hub_run(port: int, first: int, n: int) -> None:
+    subprocess.run([sys.executable, "-c", HUB, str(port), str(first), str(n)], cwd=ROOT, timeout=60, check=True)
+
+
+def _wait(cond, timeout: float = 10.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.05)
+    return cond()
+
+
+def test_hub_restart_resets_resume_point():
+    port = _free_port()
+    uri = f"ws://127.0.0.1:{port}"
+    got = []
+    recv.start_client([uri], on_message=got.append)
+    try:
+        _hub_run(port, 1, 20)
+        assert _wait(lambda: len(got) == 60), len(got)
+        first = recv.stats()["endpoints"][uri]
+        assert first["last_id"] == 20 and first["epoch"]
+
+        got.clear()
+        _hub_run(port, 1, 5)   # new process: ids 1..5 again, sequences start over too
+        assert _wait(lambda: len(got) == 15), (len(got), recv.stats())
+        st = recv.stats()["endpoints"][uri]
+        assert [m.seq for m in got] == [s for s in range(1, 6) for _ in range(3)]
+        assert st["epoch"] != first["epoch"] and st["hub_restarts"] == 1
+        assert st["duplicates"] == 0 and st["stale"] == 0 and st["last_id"] == 5
+    finally:
+        recv.stop_client()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print("ok  ", name)
@@ -0,0 +1,158 @@
+# test_wire_codec.py
+# Round-trip checks for the hub wire contract (SendData/wire_codec.py): every codec must hand the
+# receiver exactly what the JSON codec would, for record blocks, framed payloads and control messages.
+# Run from the repo root:  python -m Scripts.z_Tests.Wire_Tests.test_wire_codec   (or: python -m pytest Scripts/z_Tests/Wire_Tests)
+import json
+
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.SendData import wire_codec as wc
+from Scripts.Trading_Bot_Test3.CatchJS_Data_WS.z_Helpers.divergence_event import events_from_dicts, to_wire
+
+CODECS = (wc.LEGACY, wc.JSON, wc.MSGPACK, wc.STRUCT)
+
+# shaped like the console payloads: float prices, int and float CVD, an H1 pivot, meta/ticker extras
+SEQ_1 = [
+    {"v": 1, "source": "aggr/indicator", "tf_sec": 900, "side": "bull", "status": "✅",
+     "thread_id": "bull:113420.64-114398.93:900", "pair_id": "L1:113420.64|L2:114398.93", "sequence": 1,
+     "L1": {"time": 1757597400, "price": 113242.0}, "L2": {"time": 1757952900, "price": 114340.0},
+     "H1": {"time": 1757916000, "price": 116761.3}, "cvd": {"L1": -910772639, "L2": -931816191},
+     "meta": {"start": 1757952900, "end": 1757597400, "sIndex": 384, "eIndex": 779}},
+    {"v": 1, "source": "aggr/indicator", "tf_sec": 900, "side": "bull", "status": "❔",
+     "thread_id": "bull:114710.52-115466.41:900", "pair_id": "L1:114710.52|L2:115466.41", "sequence": 1,
+     "L1": {"time": 1758138300, "price": 114710.0}, "L2": {"time": 1758297600, "price": 115408.0},
+     "cvd": {"L1": -19924566680.51148, "L2": -21455611296.996433}, "ticker": "BTCUSDT"},
+]
+
+
+def make_block(n, *, sequence=1, tf_sec=900):
+    """n console-style payloads (deterministic)."""
+    out = []
+    for i in range(n):
+        p1, p2 = 100_000 + i * 1.25, 100_400 + i * 1.5
+        out.append({
+            "v": 1, "source": "aggr/indicator", "tf_sec": tf_sec, "side": "bull" if i % 2 else "bear",
+            "status": "✅" if i % 3 else "❔",
+            "thread_id": f"bull:{p1:.2f}-{p2:.2f}:{tf_sec}:{i}", "pair_id": f"L1:{p1:.2f}|L2:{p2:.2f}|{i}",
+            "sequence": sequence,
+            "L1": {"time": 1_757_000_000 + i * 900, "price": p1}, "L2": {"time": 1_757_009_000 + i * 900, "price": p2},
+            "cvd": {"L1": -9.1e8 - i, "L2": -9.3e8 - i},
+            "meta": {"start": 1_757_009_000, "end": 1_757_000_000, "sIndex": i, "eIndex": i + 10},
+        })
+    return out
+
+
+def _codecs():
+    return [wc.get(n) for n in CODECS if n == wc.LEGACY or n in wc.available()]
+
+
+def _ref(obj):
+    """What a JSON receiver ends up holding."""
+    return json.loads(json.dumps(to_wire(obj)))
+
+
+def _same(a, b):
+    """Equal *and* same types all the way down (1 == 1.0 == True would hide a lossy codec)."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _check(obj):
+    ref = _ref(obj)
+    for c in _codecs():
+        got = c.decode(c.encode(obj))
+        assert _same(got, ref), (c.name, obj, got)
+
+
+def _check_frame(msg_id, obj):
+    ref = _ref(obj)
+    for c in _codecs():
+        got = c.decode(c.encode_frame(msg_id, obj))
+        if c.name == wc.LEGACY:  # old receivers get the bare payload
+            assert _same(got, ref), (c.name, got)
+        else:
+            assert _same(got, {"type": wc.FRAME, "id": msg_id, "data": ref}), (c.name, got)
+            assert wc.unwrap(got) == [(msg_id, got["data"])]
+
+
+# -------------------- record payloads --------------------
+def test_blocks():
+    for blk in (make_block(50, sequence=3), SEQ_1):
+        evs = events_from_dicts(blk)
+        _check(evs)
+        _check([e.to_dict() for e in evs])   # already-wire dicts take the same path
+        _check(evs[0])
+
+
+def test_frames():
+    evs = events_from_dicts(make_block(20, sequence=7))
+    _check_frame(1, evs)
+    _check_frame(2 ** 40, evs[3])
+    _check_frame(3, {"type": "heartbeat"})
+
+
+def test_struct_packs_records():
+    evs = events_from_dicts(make_block(10))
+    before = wc.StructCodec.fallbacks
+    assert wc.get(wc.STRUCT).encode(evs)[0] != 0   # binary layout, not tagged JSON
+    assert wc.StructCodec.fallbacks == before
+
+
+def test_int_prices():
+    d = events_from_dicts(make_block(1))[0].to_dict()
+    d["L1"]["price"], d["cvd"] = 100_000, {"L1": -910_000_000, "L2": 5}
+    _check([d])
+    blob = wc.get(wc.STRUCT).encode([d])
+    assert blob[0] != 0   # ints that fit a double stay in the binary layout
+
+
+def test_odd_records_fall_back():
+    base = events_from_dicts(make_block(1))[0].to_dict()
+    odd = [
+        {"sequence": 1, "thread_id": "t"},                           # would gain v/source/side/status
+        {**base, "v": True},                                          # bool is not an int on the wire
+        {**base, "sequence": True},
+        {**base, "L1": {"time": base["L1"]["time"], "price": 2 ** 60}},  # not exact as a double
+        {**base, "L1": {"time": 1.5, "price": 1.0}},                  # float time
+        {**base, "L1": {"time": base["L1"]["time"], "price": "1.0"}},
+        {k: v for k, v in base.items() if k not in ("L1", "L2")} | {"pivots": {"L1": base["L1"]}},
+        {**base, "status": None},
+    ]
+    struct_codec = wc.get(wc.STRUCT)
+    for d in odd:
+        _check([d])
+        _check(d)
+        assert struct_codec.encode([d])[0] == 0, d   # tagged JSON, not a normalized record
+
+
+def test_mixed_block():
+    evs = events_from_dicts(make_block(3))
+    _check([evs[0], {"type": "note"}, evs[1]])
+    _check([])
+
+
+# -------------------- control messages --------------------
+def test_control_messages():
+    evs = events_from_dicts(make_block(4, sequence=9))
+    msgs = [
+        wc.ack(9, 4, 12),
+        wc.ack(None, 0),
+        wc.replay([(10, evs), (11, evs[0])], gap=True, epoch="3f9a0c1d"),
+        wc.snapshot(11, [{"symbol": "BTCUSDT", "tf_sec": 900, "side": "bull", "events": evs[:2]}], "3f9a0c1d"),
+        wc.hello("3f9a0c1d", 11),
+        wc.delta(12, 9, [{"symbol": "BTCUSDT", "base": 11, "added": evs[2:], "changed": evs[:1],
+                          "removed": ["gone"]}]),
+    ]
+    for m in msgs:
+        _check(m)
+    assert wc.unwrap(_ref(wc.hello("3f9a0c1d", 11))) == []   # no records to deliver
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print("ok  ", name)